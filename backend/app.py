@@ -7,14 +7,39 @@ from dotenv import load_dotenv
 
 from config import Config
 from models import User
+import metrics
+import profiling
+import write_behind
+import discovery
+import text_index
+import events
+import conversations
+import profiles
+import feature_store
+import invalidation
 from routes import auth, projects, users
 from routes import matches  # <-- add
+from routes import admin
+from routes import events as events_routes
+from routes import conversations as conversations_routes
+from routes import bootstrap
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 app.config.from_object(Config)
+metrics.init_app(app)
+profiling.init_app(app)
+write_behind.init_app(app)
+discovery.init_app(app)
+text_index.init_app(app)
+events.init_app(app)
+conversations.init_app(app)
+profiles.init_app(app)
+feature_store.init_app(app)
+invalidation.init_app(app)
+bootstrap.init_app(app)
 
 # --- CORS (robust for local dev) ---
 client_origins = {
@@ -32,7 +57,7 @@ CORS(
         "origins": list(client_origins),
         "supports_credentials": False,  # keep False since you're using Authorization header, not cookies
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Authorization", "Idempotency-Key"],
         "expose_headers": ["Content-Type"],
         "max_age": 600,  # cache preflight for 10 minutes
     }},
@@ -51,7 +76,7 @@ def add_cors_headers(resp):
         if origin in client_origins:
             resp.headers.setdefault("Access-Control-Allow-Origin", origin)
             resp.headers.setdefault("Vary", "Origin")
-            resp.headers.setdefault("Access-Control-Allow-Headers", "Content-Type, Authorization")
+            resp.headers.setdefault("Access-Control-Allow-Headers", "Content-Type, Authorization, Idempotency-Key")
             resp.headers.setdefault("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS")
             resp.headers.setdefault("Access-Control-Max-Age", "600")
     return resp
@@ -78,19 +103,25 @@ def before_request_auth():
        uid = get_jwt_identity()
        if uid:
            g.user = User.objects(id=uid).first()
+           if g.user:
+               g.user.update_last_active()
     except Exception as e:
        # keep this quiet unless you’re actively debugging
-       print(f"[auth] JWT error: {e}")
+       app.logger.debug(f"[auth] JWT error: {e}")
 
 
 # Connect to MongoDB
-connect(**app.config['MONGODB_SETTINGS'])
+connect(**app.config['MONGODB_SETTINGS'], event_listeners=[metrics.MongoPoolListener()])
 
 # Register blueprints
 app.register_blueprint(auth.auth_bp, url_prefix='/api/auth')
 app.register_blueprint(projects.projects_bp, url_prefix='/api/projects')
 app.register_blueprint(users.users_bp, url_prefix='/api/users')
 app.register_blueprint(matches.matches_bp, url_prefix='/api/matches')  # <-- add
+app.register_blueprint(admin.admin_bp, url_prefix='/api/admin')
+app.register_blueprint(events_routes.events_bp, url_prefix='/api/events')
+app.register_blueprint(conversations_routes.conversations_bp, url_prefix='/api/conversations')
+app.register_blueprint(bootstrap.bootstrap_bp, url_prefix='/api/bootstrap')
 
 @app.route('/')
 def home():
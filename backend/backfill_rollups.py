@@ -0,0 +1,35 @@
+"""Rebuild engagement rollups from existing matches and project applications.
+
+    python backfill_rollups.py                          # everything
+    python backfill_rollups.py --since 2024-06-01       # just recent days
+"""
+import argparse
+import os
+
+from dotenv import load_dotenv
+from mongoengine import connect, disconnect
+
+import rollups
+
+load_dotenv()
+
+MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost/pairup')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--since', help='first day to rebuild (YYYY-MM-DD, UTC)')
+    parser.add_argument('--until', help='last day to rebuild (YYYY-MM-DD, UTC)')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    connect(host=MONGODB_URI)
+    try:
+        written = rollups.backfill(args.since, args.until, args.batch_size)
+        print(f'📊 Rebuilt {written} rollup documents')
+    finally:
+        disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import os
+
+from dotenv import load_dotenv
+from mongoengine import connect, disconnect
+from pymongo import UpdateOne
+
+from models import User, Project
+from skills import normalize_skill
+
+load_dotenv()
+
+MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost/pairup')
+BATCH_SIZE = 1000
+
+
+def _backfill(collection, array_field, name_field):
+    """Stamp skill_id on every element of ``array_field``; returns documents updated."""
+    updated, ops = 0, []
+    cursor = collection.find({array_field: {'$exists': True, '$ne': []}}, {array_field: 1}).batch_size(BATCH_SIZE)
+    for doc in cursor:
+        items = doc.get(array_field) or []
+        stamped = [{**item, 'skill_id': normalize_skill(item.get(name_field))} for item in items]
+        if stamped != items:
+            ops.append(UpdateOne({'_id': doc['_id']}, {'$set': {array_field: stamped}}))
+        if len(ops) >= BATCH_SIZE:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += collection.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+
+if __name__ == '__main__':
+    connect(host=MONGODB_URI)
+    try:
+        User.ensure_indexes()
+        Project.ensure_indexes()
+        print(f"👥 Users updated: {_backfill(User._get_collection(), 'skills', 'name')}")
+        print(f"📋 Projects updated: {_backfill(Project._get_collection(), 'required_skills', 'skill')}")
+    finally:
+        disconnect()
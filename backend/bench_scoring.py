@@ -0,0 +1,74 @@
+"""Scaling benchmark for parallel_scoring on a synthetic feature store.
+
+    python bench_scoring.py --users 1000000 --queries 16 --workers 1,2,4,8
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+import feature_store
+from feature_store import FeatureStore, CATEGORIES
+from parallel_scoring import ParallelScorer, _available_cpus
+
+SKILLS = ['react', 'python', 'nodejs', 'figma', 'marketing', 'seo', 'sql', 'aws', 'docker', 'copywriting',
+          'video-editing', 'product-management', 'machine-learning', 'swift', 'golang', 'photography']
+EXPERIENCE = ['Less than 1 year', '1-2 years', '3-5 years', '5-10 years', '10+ years']
+
+
+def synthetic_users(n, seed=7):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    for _ in range(n):
+        yield {
+            '_id': ObjectId(),
+            'user_type': rng.choice(['creator', 'contributor', 'both']),
+            'categories': rng.sample(CATEGORIES, rng.randint(1, 3)),
+            'experience': rng.choice(EXPERIENCE),
+            'rating': {'average': rng.random() * 5},
+            'last_active': now - timedelta(days=rng.randint(0, 30)),
+            'skills': [{'skill_id': s} for s in rng.sample(SKILLS, rng.randint(0, 6))],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=8, help='users ranked per run (batch job width)')
+    parser.add_argument('--k', type=int, default=100)
+    parser.add_argument('--chunk-size', type=int, default=int(os.environ.get('SCORING_CHUNK_SIZE', 50000)))
+    parser.add_argument('--workers', default=','.join(str(w) for w in sorted({1, 2, 4, _available_cpus()})))
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='pairup-bench-'), 'features.bin')
+    started = time.perf_counter()
+    FeatureStore.build(path, synthetic_users(args.users))
+    print(f'🧮 {args.users} records built in {time.perf_counter() - started:.1f}s ({os.path.getsize(path) // 1024} KiB)')
+
+    store = FeatureStore(path)
+    rng = random.Random(11)
+    queries = [feature_store.RECORD.unpack(feature_store.pack(doc)) for doc in synthetic_users(args.queries, seed=rng.random())]
+
+    baseline, reference = None, None
+    print(f'{_available_cpus()} CPUs available; timings include pool start-up')
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'records/s':>12}")
+    for workers in (int(w) for w in args.workers.split(',')):
+        with ParallelScorer(path, workers=workers, chunk_size=args.chunk_size) as scorer:
+            started = time.perf_counter()
+            ranked = scorer.top_k('compatibility', queries, args.k)
+            elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        if reference is None:
+            reference = ranked
+        elif [[s for s, _ in r] for r in ranked] != [[s for s, _ in r] for r in reference]:
+            print('⚠️ results differ from the single-worker run')
+        print(f'{workers:>8} {elapsed:>9.2f} {baseline / elapsed:>7.2f}x {len(store) * len(queries) / elapsed:>12,.0f}')
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+import os
+import sys
+
+from dotenv import load_dotenv
+from mongoengine import connect, disconnect
+
+from feature_store import FeatureStore
+from models import User
+
+load_dotenv()
+
+MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost/pairup')
+FEATURE_STORE_PATH = os.environ.get('FEATURE_STORE_PATH', 'features.bin')
+BATCH_SIZE = 5000
+
+# Everything feature_store.pack reads
+FIELDS = {'is_active': 1, 'user_type': 1, 'categories': 1, 'experience': 1, 'rating': 1, 'last_active': 1,
+          'skills.skill_id': 1, 'skills.name': 1}
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else FEATURE_STORE_PATH
+    connect(host=MONGODB_URI)
+    try:
+        docs = User._get_collection().find({}, FIELDS).batch_size(BATCH_SIZE)
+        count = FeatureStore.build(path, docs)
+        print(f'🧮 Wrote {count} user records to {path} ({os.path.getsize(path) // 1024} KiB)')
+    finally:
+        disconnect()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+from dotenv import load_dotenv
+from mongoengine import connect, disconnect
+
+from models import User, Project
+from text_index import TextIndex, user_text, project_text
+
+load_dotenv()
+
+MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost/pairup')
+TEXT_INDEX_DIR = os.environ.get('TEXT_INDEX_DIR', 'text_indexes')
+BATCH_SIZE = 1000
+
+
+def build_text_indexes(directory):
+    users = User.objects(is_active=True).only('bio', 'experience', 'skills').batch_size(BATCH_SIZE)
+    user_index = TextIndex.build((u.id, user_text(u)) for u in users)
+    user_index.save(directory, 'users')
+    print(f'👥 Indexed {len(user_index.ids)} users ({len(user_index.terms)} terms)')
+
+    projects = Project.objects(status='open', is_public=True) \
+        .only('title', 'description', 'required_skills').batch_size(BATCH_SIZE)
+    project_index = TextIndex.build((p.id, project_text(p)) for p in projects)
+    project_index.save(directory, 'projects')
+    print(f'📋 Indexed {len(project_index.ids)} projects ({len(project_index.terms)} terms)')
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else TEXT_INDEX_DIR
+    connect(host=MONGODB_URI)
+    try:
+        build_text_indexes(directory)
+    finally:
+        disconnect()
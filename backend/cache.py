@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import record_cache
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with optional TTL and size budget.
+
+    ``sizeof`` maps a value to its weight (defaults to 1 per entry); entries
+    are evicted least-recently-used first until both ``max_entries`` and
+    ``max_size`` hold. Hits and misses are reported to /metrics under ``name``.
+    """
+
+    def __init__(self, name, max_entries=1024, max_size=None, ttl=None, sizeof=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sizeof = sizeof or (lambda value: 1)
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._size = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+        record_cache(self.name, entry is not None)
+        return entry[2] if entry is not None else default
+
+    def set(self, key, value):
+        size = self._sizeof(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, size, value)
+            self._size += size
+            while self._data and (len(self._data) > self.max_entries or
+                                  (self.max_size is not None and self._size > self.max_size)):
+                self._remove(next(iter(self._data)))
+
+    def update(self, key, fn):
+        """Apply ``fn`` to a cached value in place (under the cache lock); no-op if absent."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False
+            value = fn(entry[2])
+            size = self._sizeof(value)
+            self._size += size - entry[1]
+            self._data[key] = (entry[0], size, value)
+            return True
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def pop_where(self, predicate):
+        """Remove every entry whose key satisfies ``predicate``; returns how many went."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self._size -= size
@@ -0,0 +1,59 @@
+import hashlib
+from datetime import timezone
+
+from flask import current_app, request
+
+# Cache-Control per kind of read; "no-cache" lets clients keep the body but revalidate every time
+PUBLIC_REVALIDATE = 'public, no-cache'
+PRIVATE_REVALIDATE = 'private, no-cache'
+
+
+def _utc(dt):
+    # Naive datetimes from pymongo are UTC
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def latest(*timestamps):
+    """Most recent of several updated_at values; None if any is missing (no validators then)."""
+    if any(ts is None for ts in timestamps):
+        return None
+    return max(_utc(ts) for ts in timestamps)
+
+
+def validators(kind, updated_at, *parts):
+    """(weak ETag value, Last-Modified) for a representation, or (None, None) without ``updated_at``.
+
+    ``parts`` are whatever else the body depends on (viewer id, versions).
+    The ETag is weak: fields that change constantly without an updated_at
+    bump, such as last_active and view counts, may be older in a cached copy.
+    """
+    if updated_at is None:
+        return None, None
+    # Full precision in the ETag; HTTP dates only carry whole seconds
+    raw = '|'.join(str(p) for p in (kind, _utc(updated_at).isoformat()) + parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20], _utc(updated_at).replace(microsecond=0)
+
+
+def is_fresh(etag, last_modified):
+    """True when the client's copy is current; If-None-Match wins over If-Modified-Since."""
+    if etag is None:
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag, last_modified, cache_control, vary=None):
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    if vary:
+        response.vary.add(vary)
+    return response
+
+
+def not_modified(etag, last_modified, cache_control, vary=None):
+    return with_validators(current_app.response_class(status=304), etag, last_modified, cache_control, vary)
@@ -9,3 +9,55 @@ class Config:
     }
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=7)
     CLIENT_URL = os.environ.get('CLIENT_URL', 'http://localhost:3000') # <--- Add this line
+    # Directory shared by pre-fork workers for /metrics aggregation (unset = single process)
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+    # Operational endpoints (/api/admin, /metrics) and on-demand profiling; all off unless ADMIN_TOKEN is set.
+    # Scrapers send it as the X-Admin-Token header
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', '/tmp/pairup-profiles')
+    PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))
+    PROFILING_ENDPOINTS = os.environ.get(
+        'PROFILING_ENDPOINTS', 'projects.get_projects,matches.discover,matches.liked_me').split(',')
+    # Project view counting: flush period (seconds) and per-user repeat-view window (0 = count every view)
+    VIEW_FLUSH_INTERVAL = float(os.environ.get('VIEW_FLUSH_INTERVAL', 5))
+    VIEW_DEDUP_WINDOW = int(os.environ.get('VIEW_DEDUP_WINDOW', 0))
+    ACTIVITY_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_FLUSH_INTERVAL', 5))
+    # Discovery: candidates scanned and scored per rebuild, and the per-worker result cache
+    DISCOVERY_POOL_SIZE = int(os.environ.get('DISCOVERY_POOL_SIZE', 500))
+    DISCOVERY_CACHE_TTL = int(os.environ.get('DISCOVERY_CACHE_TTL', 300))
+    DISCOVERY_CACHE_MAX_ENTRIES = int(os.environ.get('DISCOVERY_CACHE_MAX_ENTRIES', 10000))
+    DISCOVERY_CACHE_MAX_CANDIDATES = int(os.environ.get('DISCOVERY_CACHE_MAX_CANDIDATES', 2000000))
+    # New signups make every cached list stale in every worker (the pool epoch), at most once per
+    # this many seconds per worker, so a busy signup rate does not defeat the cache
+    DISCOVERY_EPOCH_INTERVAL = float(os.environ.get('DISCOVERY_EPOCH_INTERVAL', 60))
+    # Offline TF-IDF indexes written by build_text_index.py (unset = plain scans only)
+    TEXT_INDEX_DIR = os.environ.get('TEXT_INDEX_DIR')
+    # Push events (/api/events/stream): 'local' delivers likes handled by this process only,
+    # 'change_stream' tails the matches collection so every worker sees every like (needs a replica set)
+    EVENTS_SOURCE = os.environ.get('EVENTS_SOURCE', 'local')
+    EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', 15))
+    EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+    EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 20000))
+    # Seconds a /api/events/ticket stays valid; tickets end up in access logs, so keep this short
+    EVENTS_TICKET_TTL = int(os.environ.get('EVENTS_TICKET_TTL', 60))
+    # Match conversations: messages per storage bucket and maximum message length
+    MESSAGE_BUCKET_SIZE = int(os.environ.get('MESSAGE_BUCKET_SIZE', 100))
+    MESSAGE_MAX_LENGTH = int(os.environ.get('MESSAGE_MAX_LENGTH', 2000))
+    # Public profiles served by /api/users/batch, cached per process
+    PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 60))
+    PROFILE_CACHE_MAX_ENTRIES = int(os.environ.get('PROFILE_CACHE_MAX_ENTRIES', 50000))
+    # Memory-mapped scoring features written by build_feature_store.py (unset = score ORM objects);
+    # when set, discovery ranks users sharing a category from it instead of using TEXT_INDEX_DIR
+    FEATURE_STORE_PATH = os.environ.get('FEATURE_STORE_PATH')
+    # Most recently active users per category scored on a discovery miss from the feature store
+    DISCOVERY_SCAN_LIMIT = int(os.environ.get('DISCOVERY_SCAN_LIMIT', 20000))
+    # Threads per worker process running the /api/bootstrap sub-queries, shared by all requests
+    BOOTSTRAP_WORKERS = int(os.environ.get('BOOTSTRAP_WORKERS', 8))
+    # Engagement rollups (/api/admin/stats): seconds between batched counter flushes
+    ROLLUP_FLUSH_INTERVAL = float(os.environ.get('ROLLUP_FLUSH_INTERVAL', 5))
+    # Cache invalidation across workers: 'local' (this process only) or 'change_stream' (every worker; needs a
+    # replica set). A worker whose stream has not polled within INVALIDATION_MAX_LAG seconds resets its caches
+    INVALIDATION_SOURCE = os.environ.get('INVALIDATION_SOURCE', 'local')
+    INVALIDATION_MAX_LAG = float(os.environ.get('INVALIDATION_MAX_LAG', 10))
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from models import Match, MessageBucket
+
+_settings = {'bucket_size': 100, 'max_length': 2000}
+
+# Characters of the latest message kept on Match.conversation for list views
+PREVIEW_LENGTH = 140
+
+
+def init_app(app):
+    _settings['bucket_size'] = app.config['MESSAGE_BUCKET_SIZE']
+    _settings['max_length'] = app.config['MESSAGE_MAX_LENGTH']
+
+
+def match_filter(match_id):
+    """Query for a match given its ObjectId or the "<user1>_<user2>" id the API hands out."""
+    if ObjectId.is_valid(match_id):
+        return {'_id': ObjectId(match_id)}
+    user1, _, user2 = match_id.partition('_')
+    if ObjectId.is_valid(user1) and ObjectId.is_valid(user2):
+        return {'user1': ObjectId(user1), 'user2': ObjectId(user2)}
+    raise ValueError('Invalid match id')
+
+
+def _participant(match_id, user_id):
+    """Filter matching the conversation only if ``user_id`` is in it and the match is mutual."""
+    return {**match_filter(match_id), 'status': 'mutual', '$or': [{'user1': user_id}, {'user2': user_id}]}
+
+
+def _unread_inc(side, sender):
+    # +1 unless ``side`` is the sender; evaluated by the server against the stored user ids
+    return {'$add': [{'$ifNull': [f'$conversation.{side}_unread', 0]}, {'$cond': [{'$eq': [f'${side}', sender]}, 0, 1]}]}
+
+
+def append_message(match_id, sender_id, body):
+    """Store a message and update Match.conversation; returns (message, match row) or None if not allowed.
+
+    A participant check reading only the match id, then two writes, neither
+    of which rewrites a whole document: an upsert pushing into the open
+    bucket, and only once that succeeded, a pipeline update on the Match
+    (counters, unread, preview). A failure between them leaves the message
+    stored with the counters one behind, never counters claiming a message
+    that does not exist.
+
+    Sends racing to open a bucket may each insert one, so a conversation can
+    have more than one bucket below MESSAGE_BUCKET_SIZE. That is harmless:
+    history() orders by message id across buckets.
+    """
+    if body is not None and not isinstance(body, str):
+        raise ValueError('Message body must be a string')
+    body = (body or '').strip()
+    if not body:
+        raise ValueError('Message body is required')
+    if len(body) > _settings['max_length']:
+        raise ValueError(f"Message is longer than {_settings['max_length']} characters")
+
+    now = datetime.now(timezone.utc)
+    message = {'_id': ObjectId(), 'sender': sender_id, 'body': body, 'sent_at': now}
+
+    matches = Match._get_collection()
+    participant = matches.find_one(_participant(match_id, sender_id), {'_id': 1})
+    if participant is None:
+        return None
+
+    MessageBucket._get_collection().update_one(
+        {'match': participant['_id'], 'count': {'$lt': _settings['bucket_size']}},
+        {
+            '$push': {'messages': message},
+            '$inc': {'count': 1},
+            '$min': {'first_id': message['_id']},
+            '$max': {'last_id': message['_id']},
+        },
+        upsert=True,
+    )
+
+    match = matches.find_one_and_update(
+        {'_id': participant['_id']},
+        [{'$set': {
+            'conversation.started': True,
+            'conversation.started_at': {'$ifNull': ['$conversation.started_at', now]},
+            'conversation.last_message_at': now,
+            'conversation.last_message_id': message['_id'],
+            'conversation.last_message_sender': sender_id,
+            'conversation.last_message_preview': {'$literal': body[:PREVIEW_LENGTH]},
+            'conversation.message_count': {'$add': [{'$ifNull': ['$conversation.message_count', 0]}, 1]},
+            'conversation.user1_unread': _unread_inc('user1', sender_id),
+            'conversation.user2_unread': _unread_inc('user2', sender_id),
+            'outcome': {'$cond': [{'$eq': ['$outcome', 'no-contact']}, 'chatted', '$outcome']},
+            'updated_at': now,
+        }}],
+        projection={'user1': 1, 'user2': 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    return message, match
+
+
+def history(match_id, user_id, before=None, limit=50):
+    """Newest-first page of messages older than message id ``before``; None if not a participant.
+
+    Walks buckets newest-first on the (match, -last_id) index and stops once
+    no remaining bucket can hold a message newer than the page's oldest one.
+    """
+    match = Match._get_collection().find_one(_participant(match_id, user_id), {'_id': 1})
+    if match is None:
+        return None
+
+    query = {'match': match['_id']}
+    if before is not None:
+        query['first_id'] = {'$lt': before}
+    buckets = MessageBucket._get_collection().find(query, {'messages': 1, 'last_id': 1}) \
+        .sort('last_id', -1).batch_size(4)
+
+    page = []
+    for bucket in buckets:
+        if len(page) >= limit and bucket['last_id'] < page[limit - 1]['_id']:
+            break
+        page.extend(m for m in bucket.get('messages', []) if before is None or m['_id'] < before)
+        page.sort(key=lambda m: m['_id'], reverse=True)
+    return page[:limit]
+
+
+def mark_read(match_id, user_id):
+    """Zero the caller's unread counter; returns False if they are not a participant."""
+    matches = Match._get_collection()
+    base = {**match_filter(match_id), 'status': 'mutual'}
+    for side in ('user1', 'user2'):
+        result = matches.update_one({**base, side: user_id}, {'$set': {f'conversation.{side}_unread': 0}})
+        if result.matched_count:
+            return True
+    return False
+
+
+def list_for(user_id, skip=0, limit=20):
+    """The user's started conversations, most recent first, as raw Match rows; returns (rows, total)."""
+    query = {
+        '$or': [{'user1': user_id}, {'user2': user_id}],
+        'status': 'mutual',
+        'conversation.started': True,
+    }
+    matches = Match._get_collection()
+    rows = list(matches.find(query, {'user1': 1, 'user2': 1, 'conversation': 1})
+                .sort('conversation.last_message_at', -1).skip(skip).limit(limit))
+    return rows, matches.count_documents(query)
@@ -0,0 +1,181 @@
+import threading
+import time
+
+from mongoengine import Q
+
+import feature_store
+import invalidation
+import text_index
+from cache import LRUCache
+from models import User, Match
+
+# Fields needed to score a candidate and render its card; skips likes arrays etc.
+CANDIDATE_FIELDS = ('name', 'avatar', 'user_type', 'categories', 'bio', 'experience', 'location',
+                    'completed_projects', 'rating', 'last_active')
+
+# Scored candidate lists, one entry per user:
+#   user id -> (profile_version, pool_epoch, [match dict, ...] sorted by score, pool_exhausted)
+_cache = LRUCache('discovery', max_entries=10000, max_size=2_000_000, ttl=300,
+                  sizeof=lambda entry: len(entry[2]) or 1)
+_settings = {'pool_size': 500, 'scan_limit': 20000, 'epoch_interval': 60.0}
+_pool_epoch = [0]
+# When this worker last bumped the epoch for a signup (None: not yet)
+_epoch_bumped_at = [None]
+_epoch_lock = threading.Lock()
+
+
+def init_app(app):
+    _cache.max_entries = app.config['DISCOVERY_CACHE_MAX_ENTRIES']
+    _cache.max_size = app.config['DISCOVERY_CACHE_MAX_CANDIDATES']
+    _cache.ttl = app.config['DISCOVERY_CACHE_TTL']
+    _settings['pool_size'] = app.config['DISCOVERY_POOL_SIZE']
+    _settings['scan_limit'] = app.config['DISCOVERY_SCAN_LIMIT']
+    _settings['epoch_interval'] = app.config['DISCOVERY_EPOCH_INTERVAL']
+
+
+def serialize_user(u: User):
+    """Map a User document to the shape expected by the React UI."""
+    rating_avg = 0.0
+    if getattr(u, "rating", None) and getattr(u.rating, "average", None) is not None:
+        rating_avg = float(u.rating.average)
+
+    return {
+        "_id": str(u.id),
+        "name": getattr(u, "name", "Unknown"),
+        "avatar": getattr(u, "avatar", "👤"),
+        "userType": getattr(u, "user_type", "contributor"),
+        "categories": list(getattr(u, "categories", [])),
+        "bio": getattr(u, "bio", ""),
+        "experience": getattr(u, "experience", ""),
+        "location": getattr(u, "location", ""),
+        "completedProjects": getattr(u, "completed_projects", 0),
+        "rating": {"average": rating_avg},
+    }
+
+
+def note_signup():
+    """Record a new user joining the pool by bumping the pool epoch in every worker.
+
+    Each worker bumps at most once per DISCOVERY_EPOCH_INTERVAL seconds, so
+    any signup rate costs each cached list at most one rebuild per interval
+    per worker; signups in between appear at the next bump or cache expiry.
+    """
+    now = time.monotonic()
+    with _epoch_lock:
+        last = _epoch_bumped_at[0]
+        if last is not None and now - last < _settings['epoch_interval']:
+            return
+        _epoch_bumped_at[0] = now
+    invalidation.publish('discovery_pool')
+
+
+def _bump_pool_epoch(_key):
+    _pool_epoch[0] += 1
+
+
+def swiped_user_ids(user):
+    """Ids of users this user has already liked or passed."""
+    rows = Match.objects(
+        (Q(user1=user) & Q(user1_action__action__in=['like', 'pass'])) |
+        (Q(user2=user) & Q(user2_action__action__in=['like', 'pass']))
+    ).only('user1', 'user2').as_pymongo()
+    return {r['user2'] if r['user1'] == user.id else r['user1'] for r in rows}
+
+
+def _score_from_store(user, store, exclude, pool_size):
+    """Score users sharing a category from the shared feature store; only the winners are loaded from Mongo.
+
+    At most DISCOVERY_SCAN_LIMIT users per category are scored, most recently
+    active first, so a miss costs the same however large the store grows.
+    The store covers every user, so it replaces the text-similarity candidate
+    set used by the scan below rather than being combined with it.
+    """
+    query = feature_store.query_for(user)
+    ranked = store.top_k(query, pool_size, exclude=exclude, categories=query[3], scan_limit=_settings['scan_limit'])
+    users = {u.id: u for u in User.objects(id__in=[oid for _, oid in ranked]).only(*CANDIDATE_FIELDS)}
+    return [{
+        "user": serialize_user(users[oid]),
+        "compatibilityScore": score,
+        "matchDetails": {"reasonForMatch": "Shared categories & interests"}
+    } for score, oid in ranked if oid in users]
+
+
+def _score_candidates(user):
+    pool_size = _settings['pool_size']
+    exclude = swiped_user_ids(user)
+    exclude.add(user.id)
+
+    store = feature_store.get_store()
+    if store is not None:
+        try:
+            return _score_from_store(user, store, exclude, pool_size)
+        except (OSError, ValueError) as e:
+            print(f"[discovery] feature store unavailable, scanning instead: {e}")
+
+    # Prefer text-similar users from the offline index; top up with a plain scan
+    candidates = []
+    similar = text_index.similar_users(user, pool_size, exclude=exclude)
+    if similar:
+        candidates = list(User.objects(id__in=similar, is_active=True).only(*CANDIDATE_FIELDS))
+        exclude.update(u.id for u in candidates)
+    # Users sharing a category first, then anyone; most recently active first so the
+    # scan does not hand every user the same oldest accounts
+    for query in ([Q(categories__in=user.categories)] if user.categories else []) + [Q()]:
+        if len(candidates) >= pool_size:
+            break
+        more = list(User.objects(query, id__nin=list(exclude), is_active=True)
+                    .only(*CANDIDATE_FIELDS).order_by('-last_active').limit(pool_size - len(candidates)))
+        exclude.update(u.id for u in more)
+        candidates += more
+
+    scored = []
+    for u in candidates:
+        try:
+            score = user.calculate_compatibility(u)
+        except Exception:
+            score = 87
+        scored.append({
+            "user": serialize_user(u),
+            "compatibilityScore": score,
+            "matchDetails": {"reasonForMatch": "Shared categories & interests"}
+        })
+    scored.sort(key=lambda m: m["compatibilityScore"], reverse=True)
+    return scored
+
+
+def discover_for(user, limit):
+    """Top ``limit`` scored candidates for ``user``, served from cache when
+    neither the user's profile version nor the pool epoch has moved."""
+    key = str(user.id)
+    version = user.profile_version or 0
+    entry = _cache.get(key)
+    if entry is None or entry[0] != version or entry[1] != _pool_epoch[0] or \
+       (len(entry[2]) < limit and not entry[3]):
+        scored = _score_candidates(user)
+        entry = (version, _pool_epoch[0], scored, len(scored) < _settings['pool_size'])
+        _cache.set(key, entry)
+    return entry[2][:limit]
+
+
+def remove_candidates(user, other_ids):
+    """Drop swiped users from this user's cached list, in every worker, without rescoring."""
+    invalidation.publish('discovery_swipe', *(f"{user.id}:{other_id}" for other_id in other_ids))
+
+
+def remove_candidate(user, other_id):
+    remove_candidates(user, [other_id])
+
+
+def _drop_candidate(key):
+    user_id, _, other_id = key.partition(':')
+    _cache.update(user_id, lambda entry: (
+        entry[0], entry[1], [m for m in entry[2] if m["user"]["_id"] != other_id], entry[3]))
+
+
+def invalidate(user_id):
+    invalidation.publish('discovery', user_id)
+
+
+invalidation.register('discovery', _cache.pop, _cache.clear)
+invalidation.register('discovery_swipe', _drop_candidate, _cache.clear)
+invalidation.register('discovery_pool', _bump_pool_epoch, _cache.clear)
@@ -0,0 +1,257 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+from pymongo.errors import PyMongoError
+
+from conversations import PREVIEW_LENGTH
+from discovery import CANDIDATE_FIELDS, serialize_user
+from metrics import EVENT_SUBSCRIBERS, EVENTS_PUBLISHED, EVENTS_DROPPED
+from models import User, Match
+
+_settings = {'source': 'local', 'heartbeat': 15.0, 'queue_size': 100, 'max_subscribers': 20000}
+_event_ids = itertools.count(1)
+
+
+class Subscriber:
+    """One open stream: a bounded queue of pending events for a single user.
+
+    A slow client never blocks publishers; when its queue is full the oldest
+    event is dropped.
+    """
+
+    def __init__(self, user_id, maxsize):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize)
+
+    def put(self, item):
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    EVENTS_DROPPED.inc()
+                except queue.Empty:
+                    pass
+
+
+class EventBus:
+    """In-process fan-out from user id to that user's open streams.
+
+    Publishing is a dict lookup plus a non-blocking put per stream, and an idle
+    stream costs one parked Queue.get. Under gevent workers
+    (``gunicorn -k gevent``) those are greenlets rather than threads, which is
+    what lets one process hold tens of thousands of idle connections.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._count = 0
+
+    def subscribe(self, user_id, maxsize):
+        """Return a new Subscriber, or None when this process is at capacity."""
+        sub = Subscriber(str(user_id), maxsize)
+        with self._lock:
+            if self._count >= _settings['max_subscribers']:
+                return None
+            self._subscribers.setdefault(sub.user_id, set()).add(sub)
+            self._count += 1
+        EVENT_SUBSCRIBERS.inc()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if not subs or sub not in subs:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[sub.user_id]
+            self._count -= 1
+        EVENT_SUBSCRIBERS.dec()
+
+    def has_subscribers(self, user_id):
+        return str(user_id) in self._subscribers
+
+    def publish(self, user_id, event, data):
+        subs = self._subscribers.get(str(user_id))
+        if not subs:
+            return
+        item = (next(_event_ids), event, data)
+        for sub in list(subs):
+            sub.put(item)
+            EVENTS_PUBLISHED.inc(event=event)
+
+
+bus = EventBus()
+
+
+def init_app(app):
+    _settings['source'] = app.config['EVENTS_SOURCE']
+    _settings['heartbeat'] = app.config['EVENTS_HEARTBEAT']
+    _settings['queue_size'] = app.config['EVENTS_QUEUE_SIZE']
+    _settings['max_subscribers'] = app.config['EVENTS_MAX_SUBSCRIBERS']
+
+
+def subscribe(user_id):
+    if _settings['source'] == 'change_stream':
+        _watcher.ensure_started()
+    return bus.subscribe(user_id, _settings['queue_size'])
+
+
+def stream(sub):
+    """Server-sent event frames for ``sub``, with comment heartbeats so proxies keep the connection open."""
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event_id, event, data = sub.queue.get(timeout=_settings['heartbeat'])
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+    finally:
+        bus.unsubscribe(sub)
+
+
+# ----------------- Match events -----------------
+
+def _match_id(user1_id, user2_id):
+    return f"{user1_id}_{user2_id}"
+
+
+def _card(user):
+    """Serialized card for a User document or id; None if the user is gone."""
+    if not isinstance(user, User):
+        user = User.objects(id=user).only(*CANDIDATE_FIELDS).first()
+    return serialize_user(user) if user else None
+
+
+def _deliver_like(liker, target):
+    target_id = getattr(target, 'id', target)
+    if not bus.has_subscribers(target_id):
+        return
+    card = _card(liker)
+    if card:
+        bus.publish(target_id, 'like-received', {"user": card})
+
+
+def _deliver_mutual(user1, user2):
+    id1, id2 = getattr(user1, 'id', user1), getattr(user2, 'id', user2)
+    match_id = _match_id(*sorted([str(id1), str(id2)]))
+    for recipient, other in ((id1, user2), (id2, user1)):
+        if bus.has_subscribers(recipient):
+            card = _card(other)
+            if card:
+                bus.publish(recipient, 'mutual', {"matchId": match_id, "user": card})
+
+
+def notify_like(liker, target, is_mutual):
+    """Push like-received (and mutual) events for a like recorded by this process.
+
+    With EVENTS_SOURCE=change_stream the Match watcher delivers these to every
+    worker instead, so this is a no-op.
+    """
+    if _settings['source'] == 'change_stream':
+        return
+    try:
+        _deliver_like(liker, target)
+        if is_mutual:
+            _deliver_mutual(liker, target)
+    except Exception as e:
+        print(f"[events] notify_like failed: {e}")
+
+
+def _message_payload(match_doc, message_id, sender_id, preview, sent_at):
+    return {
+        "matchId": _match_id(match_doc['user1'], match_doc['user2']),
+        "messageId": str(message_id),
+        "sender": str(sender_id),
+        "preview": preview,
+        "sentAt": sent_at.isoformat() if sent_at else None,
+    }
+
+
+def notify_message(match_doc, message):
+    """Push a message event to the recipient of a message stored by this process."""
+    if _settings['source'] == 'change_stream':
+        return
+    recipient = match_doc['user2'] if match_doc['user1'] == message['sender'] else match_doc['user1']
+    bus.publish(recipient, 'message', _message_payload(
+        match_doc, message['_id'], message['sender'], message['body'][:PREVIEW_LENGTH], message['sent_at']))
+
+
+class MatchWatcher:
+    """Tails the matches collection's change stream and publishes to local subscribers.
+
+    Every worker runs its own watcher, so a like handled by any worker reaches
+    streams held by any other. Requires a replica set. Starts lazily, per
+    process, on the first subscription.
+    """
+
+    # Batch swipes create a pair's Match with an upsert, which the stream reports as an insert
+    _PIPELINE = [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace']}}}]
+
+    def __init__(self):
+        self._pid = None
+        self._lock = threading.Lock()
+        self._resume_token = None
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._resume_token = None
+            threading.Thread(target=self._run, name='pairup-match-watcher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                with Match._get_collection().watch(self._PIPELINE, full_document='updateLookup',
+                                                   resume_after=self._resume_token) as changes:
+                    for change in changes:
+                        self._resume_token = change['_id']
+                        self.dispatch(change)
+            except PyMongoError as e:
+                print(f"[events] match change stream error: {e}")
+                time.sleep(1)
+
+    @staticmethod
+    def dispatch(change):
+        doc = change.get('fullDocument')
+        if not doc:
+            return
+        if change.get('operationType') == 'update':
+            updated = change.get('updateDescription', {}).get('updatedFields', {})
+        else:
+            # insert / replace: every field of the document is new
+            updated = doc
+        try:
+            for side, other in (('user1', 'user2'), ('user2', 'user1')):
+                touched = any(k == f'{side}_action' or k.startswith(f'{side}_action.') for k in updated)
+                if touched and (doc.get(f'{side}_action') or {}).get('action') == 'like':
+                    _deliver_like(doc[side], doc[other])
+            if 'status' in updated and doc.get('status') == 'mutual':
+                _deliver_mutual(doc['user1'], doc['user2'])
+            conv = doc.get('conversation') or {}
+            if conv.get('last_message_id') and \
+               any(k == 'conversation' or k.startswith('conversation.last_message_id') for k in updated):
+                sender = conv.get('last_message_sender')
+                recipient = doc['user2'] if doc['user1'] == sender else doc['user1']
+                bus.publish(recipient, 'message', _message_payload(
+                    doc, conv.get('last_message_id'), sender, conv.get('last_message_preview'),
+                    conv.get('last_message_at')))
+        except Exception as e:
+            print(f"[events] could not dispatch match change: {e}")
+
+
+_watcher = MatchWatcher()
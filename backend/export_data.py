@@ -0,0 +1,50 @@
+"""Export users, projects or matches as NDJSON or CSV.
+
+    python export_data.py users --since 2024-01-01 > users.ndjson
+    python export_data.py matches --format csv --fields status,compatibility_score --gzip -o matches.csv.gz
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+from mongoengine import connect, disconnect
+
+import exports
+
+load_dotenv()
+
+MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost/pairup')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('kind', choices=sorted(exports.EXPORTS))
+    parser.add_argument('--format', choices=exports.FORMATS, default='ndjson')
+    parser.add_argument('--fields', help='comma-separated subset of the exportable fields')
+    parser.add_argument('--since', help='created at or after (ISO date or datetime, UTC)')
+    parser.add_argument('--until', help='created before (ISO date or datetime, UTC)')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('-o', '--output', help='file to write (default: stdout)')
+    args = parser.parse_args()
+
+    try:
+        fields = exports.parse_fields(args.kind, args.fields)
+        since, until = exports.parse_date(args.since), exports.parse_date(args.until)
+    except ValueError as e:
+        parser.error(str(e))
+
+    connect(host=MONGODB_URI)
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in exports.stream(args.kind, args.format, fields, since, until, args.gzip):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+            print(f'📤 Wrote {args.kind} to {args.output} ({os.path.getsize(args.output) // 1024} KiB)', file=sys.stderr)
+        disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from models import User, Project, Match
+from profiles import PUBLIC_FIELDS
+
+BATCH_SIZE = 1000
+# Bytes of output gathered before a chunk is handed to the response or file
+CHUNK_BYTES = 64 * 1024
+FORMATS = ('ndjson', 'csv')
+
+# Exportable collections and the fields each may expose. Users are limited to
+# their public profile; matches leave out conversation previews and feedback.
+EXPORTS = {
+    'users': (User, ('_id',) + PUBLIC_FIELDS + ('is_active', 'created_at')),
+    'projects': (Project, ('_id', 'title', 'description', 'creator', 'category', 'subcategory', 'status',
+                           'timeline', 'budget', 'required_skills', 'team_size', 'location', 'work_style', 'tags',
+                           'applicant_count', 'pending_application_count', 'collaborator_count', 'rating', 'views',
+                           'featured', 'is_public', 'created_at', 'updated_at')),
+    'matches': (Match, ('_id', 'user1', 'user2', 'project', 'match_type', 'status', 'initiated_by',
+                        'user1_action', 'user2_action', 'compatibility_score', 'match_details', 'outcome',
+                        'metadata', 'expires_at', 'created_at', 'updated_at')),
+}
+
+
+def parse_fields(kind, raw):
+    """Requested comma-separated fields for ``kind`` (all allowed fields when empty); raises ValueError."""
+    allowed = EXPORTS[kind][1]
+    if not raw:
+        return allowed
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {kind} fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(['_id'] + fields))
+
+
+def parse_date(raw):
+    """ISO date or datetime (naive means UTC) to an aware datetime; None for empty; raises ValueError."""
+    if not raw:
+        return None
+    value = datetime.fromisoformat(raw)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _plain(value):
+    """BSON value to something json.dumps and csv accept."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def rows(kind, fields, since=None, until=None):
+    """Documents of ``kind`` created in [since, until), oldest first, as plain dicts.
+
+    Creation time comes from _id, which every document has and which is the
+    primary index, so the range is an index scan and the sort is free. The
+    cursor fetches BATCH_SIZE documents at a time.
+    """
+    document, _ = EXPORTS[kind]
+    query = {}
+    if since or until:
+        query['_id'] = {}
+        if since:
+            query['_id']['$gte'] = ObjectId.from_datetime(since)
+        if until:
+            query['_id']['$lt'] = ObjectId.from_datetime(until)
+    cursor = document._get_collection().find(query, {f: 1 for f in fields}).sort('_id', 1).batch_size(BATCH_SIZE)
+    try:
+        for doc in cursor:
+            yield {f: _plain(doc.get(f)) for f in fields}
+    finally:
+        cursor.close()
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def csv_lines(records, fields):
+    """Header then one line per record; nested values are written as JSON."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for record in records:
+        writer.writerow(json.dumps(v) if isinstance(v, (dict, list)) else v for v in record.values())
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _chunked(lines):
+    """Group text lines into ~CHUNK_BYTES of UTF-8."""
+    parts, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        parts.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b''.join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b''.join(parts)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(kind, fmt='ndjson', fields=None, since=None, until=None, gzip=False):
+    """Byte chunks of the export; memory stays at one cursor batch plus one chunk."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    fields = fields or EXPORTS[kind][1]
+    records = rows(kind, fields, since, until)
+    lines = csv_lines(records, fields) if fmt == 'csv' else ndjson_lines(records)
+    chunks = _chunked(lines)
+    return _gzipped(chunks) if gzip else chunks
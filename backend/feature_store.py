@@ -0,0 +1,381 @@
+import calendar
+import fcntl
+import heapq
+import itertools
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+
+from bson import ObjectId
+
+from models import COMPATIBILITY_WEIGHTS, MATCH_SCORE_WEIGHTS
+from skills import normalize_skill
+
+# Bit per category, in User.categories choice order
+CATEGORIES = ('Technology', 'Design', 'Content', 'Business', 'Events', 'Creative')
+_CATEGORY_BITS = {c: 1 << i for i, c in enumerate(CATEGORIES)}
+USER_TYPES = {'creator': 1, 'contributor': 2, 'both': 3}
+MAX_SKILLS = 8
+FLAG_ACTIVE = 1
+
+MAGIC = b'PUFS'
+FORMAT_VERSION = 2
+# magic, format version, record size, records in the sorted base region, records in the append tail,
+# offset of the first record, then per category the number of base slots in its slot list
+HEADER = struct.Struct(f'<4sHHIII{len(CATEGORIES)}I')
+HEADER_SIZE = 64
+_TAIL_COUNT_OFFSET = 12
+# id, flags, user type, category mask, skill count, experience id, rating, last active (epoch s), skill ids
+RECORD = struct.Struct(f'<12sBBBBIfI{MAX_SKILLS}I')
+_CATEGORY_OFFSET = 12 + 2
+_LAST_ACTIVE_OFFSET = 12 + 4 + 4 + 4
+_LAST_ACTIVE = struct.Struct('<I')
+
+_POPCOUNT = [bin(i).count('1') for i in range(1 << len(CATEGORIES))]
+# Same pairs calculate_compatibility rewards: anyone with 'both', or creator <-> contributor
+_TYPE_SCORE = [[COMPATIBILITY_WEIGHTS['user_type'] if (a == 3 or b == 3 or {a, b} == {1, 2}) else 0
+                for b in range(4)] for a in range(4)]
+
+
+def _crc(value):
+    # 0 means "none", so a string that happens to hash to 0 is nudged to 1
+    return zlib.crc32(value.encode('utf-8')) or 1
+
+
+def _epoch(dt):
+    # Naive datetimes from pymongo are UTC
+    return calendar.timegm(dt.utctimetuple()) if dt else 0
+
+
+def pack(doc):
+    """One fixed-size record from a raw User document (``to_mongo()`` or pymongo dict)."""
+    mask = 0
+    for category in doc.get('categories') or []:
+        mask |= _CATEGORY_BITS.get(category, 0)
+    skills = sorted({_crc(s.get('skill_id') or normalize_skill(s.get('name')) or '') for s in doc.get('skills') or []
+                     if s.get('skill_id') or s.get('name')})[:MAX_SKILLS]
+    experience = doc.get('experience')
+    rating = (doc.get('rating') or {}).get('average') or 0.0
+    return RECORD.pack(
+        doc['_id'].binary,
+        FLAG_ACTIVE if doc.get('is_active', True) else 0,
+        USER_TYPES.get(doc.get('user_type'), 0),
+        mask,
+        len(skills),
+        _crc(experience) if experience else 0,
+        rating,
+        _epoch(doc.get('last_active')),
+        *(skills + [0] * (MAX_SKILLS - len(skills))),
+    )
+
+
+def compatibility(me, other, now):
+    """me.calculate_compatibility(other) over two unpacked records."""
+    w = COMPATIBILITY_WEIGHTS
+    mine, theirs = _POPCOUNT[me[3]], _POPCOUNT[other[3]]
+    score = _POPCOUNT[me[3] & other[3]] / max(mine, theirs, 1) * w['categories']
+    score += _TYPE_SCORE[me[2]][other[2]]
+    if me[5] and me[5] == other[5]:
+        score += w['experience']
+    score += other[6] / 5 * w['rating']
+    days_since_active = (now - other[7]) // 86400 if other[7] else 0
+    score += max(0, 10 - days_since_active) / 10 * w['activity']
+    return min(100, max(0, score))
+
+
+def project_query(project):
+    """Scoring query for ``match_score``: (category bit, required canonical skill ids as crc32)."""
+    required = {_crc(s.skill_id or normalize_skill(s.skill) or '') for s in project.required_skills or []
+                if s.skill_id or s.skill}
+    return _CATEGORY_BITS.get(project.category, 0), frozenset(required)
+
+
+def match_score(project, user, now):
+    """Project.calculate_match_score(user) for a ``project_query`` and an unpacked user record.
+
+    Skill overlap only sees the user's first MAX_SKILLS skills.
+    """
+    category_bit, required = project
+    score = MATCH_SCORE_WEIGHTS['category'] if user[3] & category_bit else 0
+    if required:
+        overlap = sum(1 for skill in user[8:8 + user[4]] if skill in required)
+        score += overlap / len(required) * MATCH_SCORE_WEIGHTS['skills']
+    if user[2] in (USER_TYPES['contributor'], USER_TYPES['both']):
+        score += MATCH_SCORE_WEIGHTS['user_type']
+    score += user[6] / 5 * MATCH_SCORE_WEIGHTS['rating']
+    return min(100, max(0, score))
+
+
+def _best(records, scorer, queries, k, excludes=None, now=None):
+    """Per query, the top ``k`` (score, ObjectId bytes) among the active unpacked ``records``."""
+    now = int(now or time.time())
+    excludes = excludes or [frozenset()] * len(queries)
+    heaps = [[] for _ in queries]
+    for record in records:
+        if not record[1] & FLAG_ACTIVE:
+            continue
+        for query, exclude, best in zip(queries, excludes, heaps):
+            if record[0] in exclude:
+                continue
+            item = (scorer(query, record, now), record[0])
+            if len(best) < k:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+    return [sorted(best, reverse=True) for best in heaps]
+
+
+class FeatureStore:
+    """Scoring features for every user in one memory-mapped file.
+
+    Records are fixed-size: a base region sorted by ObjectId (binary search)
+    followed by an append-only tail for users added since the last build.
+    Ahead of the records, one slot list per category names the base records
+    in that category, most recently active first, so category-filtered
+    queries read their candidates straight from the mapping. Every worker
+    maps the file read-only, so the pages live once in the OS page cache
+    however many workers there are. Updates are written in place under an
+    exclusive flock and show through every worker's mapping;
+    build_feature_store.py rewrites the file to fold the tail into the base
+    and re-sort the slot lists.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._map = None
+        self._inode = None
+        self._tail = None  # (inode, base, {ObjectId bytes: tail slot})
+
+    @staticmethod
+    def build(path, docs):
+        """Write a fresh store from raw User documents; atomically replaces ``path``. Returns the record count."""
+        records = sorted(pack(doc) for doc in docs)
+        activity = [(r[_CATEGORY_OFFSET], _LAST_ACTIVE.unpack_from(r, _LAST_ACTIVE_OFFSET)[0]) for r in records]
+        by_category = []
+        for bit in _CATEGORY_BITS.values():
+            members = sorted(((-last_active, slot) for slot, (mask, last_active) in enumerate(activity) if mask & bit))
+            by_category.append(array('I', (slot for _, slot in members)))
+        records_at = HEADER_SIZE + 4 * sum(len(slots) for slots in by_category)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size, len(records), 0, records_at,
+                                *(len(slots) for slots in by_category)).ljust(HEADER_SIZE, b'\0'))
+            for slots in by_category:
+                slots.tofile(f)
+            f.writelines(records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return len(records)
+
+    # ----- reading -----
+
+    def _mapped(self):
+        """Current mapping, remapped after a rebuild (new inode) or when the tail outgrew it."""
+        st = os.stat(self.path)
+        m = self._map
+        if m is not None and self._inode == st.st_ino and len(m) >= st.st_size:
+            return m
+        with self._lock:
+            if self._map is None or self._inode != st.st_ino or len(self._map) < st.st_size:
+                with open(self.path, 'rb') as f:
+                    new_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, record_size = HEADER.unpack_from(new_map)[:3]
+                if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD.size:
+                    new_map.close()
+                    raise ValueError(f"{self.path} has an incompatible format; rebuild it")
+                self._map, self._inode = new_map, st.st_ino
+            return self._map
+
+    @staticmethod
+    def _layout(m):
+        """(base records, tail records, offset of the first record)."""
+        return HEADER.unpack_from(m)[3:6]
+
+    def counts(self):
+        """(base records, tail records)."""
+        return self._layout(self._mapped())[:2]
+
+    def __len__(self):
+        return sum(self.counts())
+
+    def _category_slots(self, m, bit_index):
+        """Base slots of one category, most recently active (as of the build) first; a view into the mapping."""
+        lengths = HEADER.unpack_from(m)[6:]
+        start = HEADER_SIZE + 4 * sum(lengths[:bit_index])
+        return memoryview(m)[start:start + 4 * lengths[bit_index]].cast('I')
+
+    def _tail_slots(self, m, inode, base, tail, records_at):
+        """{ObjectId bytes: slot} for the append tail, extended as it grows.
+
+        Tail records never move, so only entries appended since the last call
+        are read; a rebuild (new inode or base) starts over.
+        """
+        with self._lock:
+            cached = self._tail
+            if cached is None or cached[0] != inode or cached[1] != base:
+                cached = self._tail = (inode, base, {})
+            slots = cached[2]
+            for slot in range(base + len(slots), base + tail):
+                offset = records_at + slot * RECORD.size
+                slots[m[offset:offset + 12]] = slot
+            return slots
+
+    def _slot(self, m, key, inode):
+        base, tail, records_at = self._layout(m)
+        lo, hi = 0, base
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = records_at + mid * RECORD.size
+            current = m[offset:offset + 12]
+            if current < key:
+                lo = mid + 1
+            elif current > key:
+                hi = mid
+            else:
+                return mid
+        return self._tail_slots(m, inode, base, tail, records_at).get(key) if tail else None
+
+    def get(self, user_id):
+        """Unpacked record for ``user_id`` or None."""
+        m = self._mapped()
+        slot = self._slot(m, ObjectId(user_id).binary, self._inode)
+        return RECORD.unpack_from(m, self._layout(m)[2] + slot * RECORD.size) if slot is not None else None
+
+    def score_range(self, scorer, queries, start, stop, k, excludes=None, now=None):
+        """Per query, the top ``k`` (score, ObjectId bytes) among active records in slots [start, stop).
+
+        Each record is unpacked once and scored against every query with
+        ``scorer(query, record, now)``; ``excludes`` holds one set of
+        ObjectId bytes per query.
+        """
+        m = self._mapped()
+        records_at = self._layout(m)[2]
+        start, stop = records_at + start * RECORD.size, records_at + stop * RECORD.size
+        return _best(RECORD.iter_unpack(memoryview(m)[start:stop]), scorer, queries, k, excludes, now)
+
+    def top_k(self, query, k, exclude=(), scorer=compatibility, categories=0, scan_limit=None):
+        """Best ``k`` (score, ObjectId) for one query, excluding ObjectIds in ``exclude``.
+
+        With a ``categories`` bit mask only records sharing one of those
+        categories are scored: per category at most ``scan_limit`` base
+        records, most recently active first, plus the unsorted tail. Other
+        base records are scored, up to ``scan_limit`` of them, only when that
+        leaves fewer than ``k``. Cost then depends on ``scan_limit``, not on
+        the size of the store.
+        """
+        exclude = {ObjectId(e).binary for e in exclude}
+        if not categories:
+            ranked = self.score_range(scorer, [query], 0, len(self), k, [exclude])[0]
+            return [(score, ObjectId(raw)) for score, raw in ranked]
+
+        m = self._mapped()
+        base, tail, records_at = self._layout(m)
+        slots = set(range(base, base + tail))
+        for bit_index, bit in enumerate(_CATEGORY_BITS.values()):
+            if categories & bit:
+                slots.update(self._category_slots(m, bit_index)[:scan_limit])
+        records = (RECORD.unpack_from(m, records_at + slot * RECORD.size) for slot in slots)
+        ranked = _best(records, scorer, [query], k, [exclude])[0]
+        if len(ranked) < k:
+            exclude.update(raw for _, raw in ranked)
+            rest = (slot for slot in range(base) if slot not in slots)
+            if scan_limit is not None:
+                rest = itertools.islice(rest, scan_limit)
+            records = (RECORD.unpack_from(m, records_at + slot * RECORD.size) for slot in rest)
+            ranked += _best(records, scorer, [query], k - len(ranked), [exclude])[0]
+        return [(score, ObjectId(raw)) for score, raw in ranked]
+
+    # ----- incremental updates -----
+
+    def upsert(self, doc):
+        """Write one user's record in place, appending to the tail if they are new."""
+        record = pack(doc)
+        with open(self.path, 'r+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    base, tail, records_at = self._layout(m)
+                    slot = self._slot(m, record[:12], os.fstat(f.fileno()).st_ino)
+                finally:
+                    m.close()
+                if slot is not None:
+                    os.pwrite(f.fileno(), record, records_at + slot * RECORD.size)
+                    return
+                # Record first, then the count, so readers never see a half-written tail entry
+                os.pwrite(f.fileno(), record, records_at + (base + tail) * RECORD.size)
+                os.pwrite(f.fileno(), struct.pack('<I', tail + 1), _TAIL_COUNT_OFFSET)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def touch_many(self, last_active):
+        """Update last-active times ({user id: datetime}) for users already in the store."""
+        with open(self.path, 'r+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    records_at = self._layout(m)[2]
+                    inode = os.fstat(f.fileno()).st_ino
+                    slots = [(self._slot(m, ObjectId(uid).binary, inode), when) for uid, when in last_active.items()]
+                finally:
+                    m.close()
+                for slot, when in slots:
+                    if slot is not None:
+                        os.pwrite(f.fileno(), struct.pack('<I', _epoch(when)),
+                                  records_at + slot * RECORD.size + _LAST_ACTIVE_OFFSET)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ----------------- Process-wide access -----------------
+
+_settings = {'path': None}
+_stores = {}
+
+
+def init_app(app):
+    _settings['path'] = app.config.get('FEATURE_STORE_PATH')
+
+
+def get_store():
+    """The configured store, or None when unset or not built yet."""
+    path = _settings['path']
+    if not path or not os.path.exists(path):
+        return None
+    store = _stores.get(path)
+    if store is None:
+        store = _stores.setdefault(path, FeatureStore(path))
+    return store
+
+
+def query_for(user):
+    """Unpacked record for a User document, used as the scoring query."""
+    return RECORD.unpack(pack(user.to_mongo()))
+
+
+def record_profile(user):
+    """Refresh ``user``'s record after a profile change; failures only cost freshness."""
+    store = get_store()
+    if store is None:
+        return
+    try:
+        store.upsert(user.to_mongo())
+    except (OSError, ValueError) as e:
+        print(f"[feature_store] could not update {user.id}: {e}")
+
+
+def record_activity(last_active):
+    store = get_store()
+    if store is None:
+        return
+    try:
+        store.touch_many(last_active)
+    except (OSError, ValueError) as e:
+        print(f"[feature_store] could not update last_active: {e}")
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from pymongo.errors import PyMongoError
+
+from metrics import INVALIDATIONS_PUBLISHED, INVALIDATIONS_APPLIED, INVALIDATION_LAG, INVALIDATION_RESETS
+from models import CacheInvalidation
+
+_settings = {'source': 'local', 'max_lag': 10.0}
+_handlers = {}
+_origin = {'pid': None, 'token': None}
+
+
+def init_app(app):
+    _settings['source'] = app.config['INVALIDATION_SOURCE']
+    _settings['max_lag'] = app.config['INVALIDATION_MAX_LAG']
+    if _settings['source'] == 'change_stream':
+        app.before_request(_watcher.ensure_started)
+
+
+def register(topic, handler, reset=None):
+    """Run ``handler(key)`` in every worker when ``topic`` is published.
+
+    ``reset()`` drops everything the handler guards; it runs when this worker
+    may have missed invalidations (stream lost or lagging past
+    INVALIDATION_MAX_LAG).
+    """
+    _handlers[topic] = (handler, reset)
+
+
+def _origin_token():
+    # Per process, so a forked worker does not skip events published by its siblings
+    if _origin['pid'] != os.getpid():
+        _origin['pid'], _origin['token'] = os.getpid(), uuid.uuid4().hex
+    return _origin['token']
+
+
+def _apply(topic, key):
+    handler, _ = _handlers.get(topic, (None, None))
+    if handler is None:
+        return
+    try:
+        handler(key)
+        INVALIDATIONS_APPLIED.inc(topic=topic)
+    except Exception as e:
+        print(f"[invalidation] {topic} handler failed for {key}: {e}")
+
+
+def reset_all():
+    """Drop every registered cache in this worker."""
+    INVALIDATION_RESETS.inc()
+    for topic, (_, reset) in _handlers.items():
+        if reset is not None:
+            reset()
+
+
+def publish(topic, *keys):
+    """Invalidate ``keys`` under ``topic`` here at once and, with change_stream, in every other worker.
+
+    Each event is a CacheInvalidation document; its ObjectId orders it
+    against every other event and doubles as its version.
+    """
+    keys = [str(k) for k in keys] or ['']
+    for key in keys:
+        _apply(topic, key)
+    INVALIDATIONS_PUBLISHED.inc(len(keys), topic=topic)
+    if _settings['source'] != 'change_stream':
+        return
+    now = datetime.now(timezone.utc)
+    origin = _origin_token()
+    try:
+        CacheInvalidation._get_collection().insert_many(
+            [{'topic': topic, 'key': key, 'origin': origin, 'at': now} for key in keys], ordered=False)
+    except PyMongoError as e:
+        # Other workers catch up through their cache TTLs
+        print(f"[invalidation] could not broadcast {topic}: {e}")
+
+
+class InvalidationWatcher:
+    """Tails inserts into cache_invalidations and applies them to this worker's caches.
+
+    Requires a replica set. Starts lazily per process on its first request.
+    After a stream error the watcher resumes from its last event; if the
+    worker may have missed events (no resume possible, or no confirmed poll
+    within INVALIDATION_MAX_LAG) every registered cache is reset, so staleness
+    is bounded by that setting rather than by cache TTLs.
+    """
+
+    _PIPELINE = [{'$match': {'operationType': 'insert'}}]
+
+    def __init__(self):
+        self._pid = None
+        self._lock = threading.Lock()
+        self._resume_token = None
+        self._last_poll = None
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            self._check_lag()
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._resume_token = None
+            self._last_poll = time.monotonic()
+            threading.Thread(target=self._run, name='pairup-invalidation-watcher', daemon=True).start()
+
+    def _check_lag(self):
+        if self._last_poll is not None and time.monotonic() - self._last_poll > _settings['max_lag']:
+            # Restart the clock first so concurrent requests reset once
+            self._last_poll = time.monotonic()
+            print(f"[invalidation] no stream poll for over {_settings['max_lag']}s; resetting caches")
+            reset_all()
+
+    def _run(self):
+        while True:
+            try:
+                with CacheInvalidation._get_collection().watch(
+                        self._PIPELINE, resume_after=self._resume_token, max_await_time_ms=1000) as changes:
+                    while changes.alive:
+                        change = changes.try_next()
+                        self._last_poll = time.monotonic()
+                        if change is not None:
+                            self._resume_token = change['_id']
+                            self.dispatch(change)
+            except PyMongoError as e:
+                print(f"[invalidation] change stream error: {e}")
+                if self._resume_token is None or self._is_resume_error(e):
+                    # Events published while disconnected cannot be replayed
+                    self._resume_token = None
+                    reset_all()
+                time.sleep(1)
+
+    @staticmethod
+    def _is_resume_error(error):
+        # ChangeStreamHistoryLost (286) or an expired/invalid resume token
+        return getattr(error, 'code', None) in (260, 280, 286)
+
+    @staticmethod
+    def dispatch(change):
+        doc = change.get('fullDocument') or {}
+        if doc.get('origin') == _origin_token():
+            return  # Already applied when this process published it
+        _apply(doc.get('topic'), doc.get('key', ''))
+        at = doc.get('at')
+        if at is not None:
+            at = at if at.tzinfo else at.replace(tzinfo=timezone.utc)
+            INVALIDATION_LAG.observe(max(0.0, (datetime.now(timezone.utc) - at).total_seconds()))
+
+
+_watcher = InvalidationWatcher()
@@ -0,0 +1,415 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from pymongo import monitoring
+
+from middleware import require_admin_token
+
+# Default latency buckets (seconds), tuned for API calls that usually hit Mongo once or twice
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _label_str(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts..., +Inf count, sum]
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+# ----------------- Metric definitions -----------------
+
+REQUEST_LATENCY = Histogram(
+    'pairup_http_request_duration_seconds', 'Request latency by blueprint and route.',
+    ('blueprint', 'route', 'method'))
+REQUESTS_TOTAL = Counter(
+    'pairup_http_requests_total', 'Requests served by blueprint, route and status.',
+    ('blueprint', 'route', 'method', 'status'))
+REQUESTS_IN_FLIGHT = Gauge(
+    'pairup_http_requests_in_flight', 'Requests currently being handled.', ('blueprint',))
+
+MONGO_POOL_CONNECTIONS = Gauge(
+    'pairup_mongo_pool_connections', 'Mongo pool connections by state.', ('state',))
+MONGO_POOL_MAX_SIZE = Gauge(
+    'pairup_mongo_pool_max_size', 'Configured maxPoolSize of the Mongo pool.')
+MONGO_POOL_WAIT = Histogram(
+    'pairup_mongo_pool_wait_seconds', 'Time spent waiting to check a connection out of the pool.',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+MONGO_CHECKOUT_FAILURES = Counter(
+    'pairup_mongo_pool_checkout_failures_total', 'Failed pool checkouts by reason.', ('reason',))
+
+BCRYPT_IN_PROGRESS = Gauge(
+    'pairup_bcrypt_in_progress', 'bcrypt hash/check operations currently running (queue depth).')
+BCRYPT_DURATION = Histogram(
+    'pairup_bcrypt_duration_seconds', 'bcrypt operation latency.', ('op',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+CACHE_REQUESTS = Counter(
+    'pairup_cache_requests_total', 'In-process cache lookups by cache and result.', ('cache', 'result'))
+
+SWIPES_TOTAL = Counter(
+    'pairup_swipes_total', 'Swipe outcomes (like / pass / mutual).', ('outcome',))
+
+EVENT_SUBSCRIBERS = Gauge(
+    'pairup_event_subscribers', 'Open server-sent event streams.')
+EVENTS_PUBLISHED = Counter(
+    'pairup_events_published_total', 'Push events delivered to local subscriber queues.', ('event',))
+EVENTS_DROPPED = Counter(
+    'pairup_events_dropped_total', 'Push events dropped because a subscriber queue was full.')
+
+INVALIDATIONS_PUBLISHED = Counter(
+    'pairup_cache_invalidations_published_total', 'Cache invalidations published by this process.', ('topic',))
+INVALIDATIONS_APPLIED = Counter(
+    'pairup_cache_invalidations_applied_total', 'Cache invalidations applied to this process\'s caches.', ('topic',))
+INVALIDATION_LAG = Histogram(
+    'pairup_cache_invalidation_lag_seconds', 'Time from publishing an invalidation to applying it in another worker.',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+INVALIDATION_RESETS = Counter(
+    'pairup_cache_invalidation_resets_total', 'Full cache resets after the invalidation stream was lost or lagged.')
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+@contextmanager
+def track_bcrypt(op):
+    """Count a bcrypt call as queued/running and time it."""
+    with BCRYPT_IN_PROGRESS.track_inprogress():
+        with BCRYPT_DURATION.time(op=op):
+            yield
+
+
+# ----------------- Mongo pool monitoring -----------------
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Feeds pool utilization and checkout wait times into the metrics above."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def pool_created(self, event):
+        max_size = (event.options or {}).get('maxPoolSize')
+        if max_size is not None:
+            MONGO_POOL_MAX_SIZE.set(max_size)
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc(state='open')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec(state='open')
+
+    def connection_check_out_started(self, event):
+        # Checkout happens synchronously on the calling thread
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        MONGO_CHECKOUT_FAILURES.inc(reason=str(event.reason))
+        self._observe_wait()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CONNECTIONS.inc(state='checked_out')
+        self._observe_wait()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS.dec(state='checked_out')
+
+    def _observe_wait(self):
+        started = getattr(self._local, 'started', None)
+        if started is not None:
+            MONGO_POOL_WAIT.observe(time.perf_counter() - started)
+            self._local.started = None
+
+
+# ----------------- Multi-process aggregation -----------------
+# Pre-fork servers (gunicorn) run one registry per worker. When METRICS_DIR is
+# set every worker periodically dumps its registry to <METRICS_DIR>/<pid>.json
+# and /metrics merges all files: counters and histograms are summed across
+# live workers plus aggregate.json, gauges only across live workers. A worker
+# starting up folds the snapshots of exited workers into aggregate.json and
+# deletes them, so the directory stays small and totals never go backwards.
+
+_flush_state = {'last': 0.0, 'pid': None}
+_AGGREGATE = 'aggregate.json'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _locked(directory, mode):
+    """flock on <directory>/.lock; absorbing takes it exclusively, merging shared."""
+    with open(os.path.join(directory, '.lock'), 'a') as f:
+        fcntl.flock(f, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f).get('metrics', {})
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_files(directory):
+    for fname in os.listdir(directory):
+        stem, ext = os.path.splitext(fname)
+        if ext == '.json' and stem.isdigit():
+            yield int(stem), os.path.join(directory, fname)
+
+
+def _merge(merged, kinds, metrics, alive):
+    for name, series in metrics.items():
+        if name not in merged or (kinds[name] == 'gauge' and not alive):
+            continue
+        target = merged[name]
+        for labels, value in series:
+            key = tuple(labels)
+            if isinstance(value, list):
+                prev = target.get(key)
+                target[key] = [a + b for a, b in zip(prev, value)] if prev else list(value)
+            else:
+                target[key] = target.get(key, 0) + value
+
+
+def _absorb_dead(directory, own_pid):
+    """Fold the snapshots of exited workers into aggregate.json and delete them.
+
+    Like prometheus_client's mark_process_dead, but run by each worker as it
+    starts. A snapshot under ``own_pid`` was left by an earlier process that
+    had the same pid, since this one has not written yet.
+    """
+    kinds = {m.name: m.kind for m in _registry}
+    with _locked(directory, fcntl.LOCK_EX):
+        dead = [path for pid, path in _pid_files(directory) if pid == own_pid or not _pid_alive(pid)]
+        if not dead:
+            return
+        aggregate_path = os.path.join(directory, _AGGREGATE)
+        aggregate = {m.name: {} for m in _registry}
+        for path in [aggregate_path] + dead:
+            _merge(aggregate, kinds, _read(path) or {}, alive=False)
+        tmp = aggregate_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'metrics': {name: [[list(k), v] for k, v in series.items()]
+                                   for name, series in aggregate.items()}}, f)
+        os.replace(tmp, aggregate_path)
+        for path in dead:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def write_snapshot(directory):
+    os.makedirs(directory, exist_ok=True)
+    pid = os.getpid()
+    if _flush_state['pid'] != pid:
+        _absorb_dead(directory, pid)
+        _flush_state['pid'] = pid
+    data = {m.name: m.snapshot() for m in _registry}
+    tmp = os.path.join(directory, f'.{pid}.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({'pid': pid, 'metrics': data}, f)
+    os.replace(tmp, os.path.join(directory, f'{pid}.json'))
+    _flush_state['last'] = time.monotonic()
+
+
+def _collect(directory):
+    """Return {metric name: {label tuple: value}} merged across workers."""
+    if not directory:
+        return {m.name: {tuple(k): v for k, v in m.snapshot()} for m in _registry}
+
+    write_snapshot(directory)
+    merged = {m.name: {} for m in _registry}
+    kinds = {m.name: m.kind for m in _registry}
+    with _locked(directory, fcntl.LOCK_SH):
+        _merge(merged, kinds, _read(os.path.join(directory, _AGGREGATE)) or {}, alive=False)
+        for pid, path in _pid_files(directory):
+            metrics = _read(path)
+            if metrics is not None:
+                _merge(merged, kinds, metrics, _pid_alive(pid))
+    return merged
+
+
+def render(directory=None):
+    collected = _collect(directory)
+    lines = []
+    for m in _registry:
+        lines.append(f'# HELP {m.name} {m.documentation}')
+        lines.append(f'# TYPE {m.name} {m.kind}')
+        for key, value in sorted(collected.get(m.name, {}).items()):
+            if m.kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(m.buckets, value):
+                    cumulative += count
+                    lines.append(f'{m.name}_bucket{_label_str(m.labelnames, key, ("le", repr(float(bound))))} {cumulative}')
+                cumulative += value[len(m.buckets)]
+                lines.append(f'{m.name}_bucket{_label_str(m.labelnames, key, ("le", "+Inf"))} {cumulative}')
+                lines.append(f'{m.name}_sum{_label_str(m.labelnames, key)} {value[-1]}')
+                lines.append(f'{m.name}_count{_label_str(m.labelnames, key)} {cumulative}')
+            else:
+                lines.append(f'{m.name}{_label_str(m.labelnames, key)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# ----------------- Flask wiring -----------------
+
+def _route_labels():
+    blueprint = request.blueprint or 'app'
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    return blueprint, route
+
+
+def init_app(app):
+    """Register request timing hooks and the /metrics endpoint."""
+    app.config.setdefault('METRICS_DIR', None)
+    app.config.setdefault('METRICS_FLUSH_INTERVAL', 5)
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+        g._metrics_status = 500
+        REQUESTS_IN_FLIGHT.inc(blueprint=request.blueprint or 'app')
+
+    @app.after_request
+    def _metrics_status(resp):
+        g._metrics_status = resp.status_code
+        return resp
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        blueprint, route = _route_labels()
+        REQUESTS_IN_FLIGHT.dec(blueprint=blueprint)
+        REQUEST_LATENCY.observe(time.perf_counter() - start, blueprint=blueprint, route=route, method=request.method)
+        REQUESTS_TOTAL.inc(blueprint=blueprint, route=route, method=request.method,
+                           status=g.pop('_metrics_status', 500))
+
+        directory = app.config['METRICS_DIR']
+        if directory and time.monotonic() - _flush_state['last'] >= app.config['METRICS_FLUSH_INTERVAL']:
+            try:
+                write_snapshot(directory)
+            except OSError as e:
+                print(f"[metrics] snapshot write failed: {e}")
+
+    @app.route('/metrics')
+    @require_admin_token
+    def metrics_endpoint():
+        return Response(render(app.config['METRICS_DIR']), mimetype='text/plain; version=0.0.4')
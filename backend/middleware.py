@@ -1,14 +1,23 @@
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import get_jwt_identity
+from flask import jsonify, g
+
+def _current_user():
+    """The user app.before_request loaded for this request's token (None if it no longer exists).
+
+    That load happens for every authenticated request anyway, so checking
+    its fields here costs no query and always sees the current profile.
+    """
+    return getattr(g, 'user', None)
+
+_USER_NOT_FOUND = {"success": False, "message": "User not found"}
 
 def require_user_type(allowed_types):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            from models import User
-            current_user_id = get_jwt_identity()
-            user = User.objects.get(id=current_user_id)
+            user = _current_user()
+            if user is None:
+                return jsonify(_USER_NOT_FOUND), 401
             if user.user_type not in allowed_types:
                 return jsonify({
                     "success": False,
@@ -21,15 +30,10 @@ def require_user_type(allowed_types):
 def require_complete_profile(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        from models import User
-        current_user_id = get_jwt_identity()
-        user = User.objects.get(id=current_user_id)
-        
-        required_fields = ['name', 'user_type', 'bio', 'experience', 'location']
-        missing_fields = [field for field in required_fields if not getattr(user, field)]
-        
-        if not user.categories:
-            missing_fields.append('categories')
+        user = _current_user()
+        if user is None:
+            return jsonify(_USER_NOT_FOUND), 401
+        missing_fields = user.missing_profile_fields()
             
         if missing_fields:
             return jsonify({
@@ -38,4 +42,18 @@ def require_complete_profile(fn):
                 "missingFields": missing_fields
             }), 400
         return fn(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+def require_admin_token(fn):
+    """Guard operational endpoints with the X-Admin-Token header (disabled when ADMIN_TOKEN is unset)."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        from flask import current_app, request
+        from profiling import admin_token_matches
+        if not current_app.config.get('ADMIN_TOKEN'):
+            return jsonify({"success": False, "message": "Not found"}), 404
+        if not admin_token_matches(current_app, request.headers.get('X-Admin-Token')):
+            return jsonify({"success": False, "message": "Access denied"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
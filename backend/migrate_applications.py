@@ -0,0 +1,75 @@
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from mongoengine import connect, disconnect
+from pymongo import UpdateOne
+
+from models import Project, ProjectApplication, ProjectCollaborator
+
+load_dotenv()
+
+MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost/pairup')
+BATCH_SIZE = 500
+
+
+def _upsert_ops(project_id, items, fields):
+    """Insert-only upserts keyed on (project, user); rerunning never overwrites newer state."""
+    ops = []
+    for item in items:
+        if not item.get('user'):
+            continue
+        doc = {f: item[f] for f in fields if f in item}
+        ops.append(UpdateOne({'project': project_id, 'user': item['user']}, {'$setOnInsert': doc}, upsert=True))
+    return ops
+
+
+def migrate():
+    """Move embedded applications/collaborators into their collections; returns projects migrated."""
+    projects = Project._get_collection()
+    applications = ProjectApplication._get_collection()
+    collaborators = ProjectCollaborator._get_collection()
+    now = datetime.now(timezone.utc)
+
+    migrated = 0
+    cursor = projects.find(
+        {'$or': [{'applications': {'$exists': True}}, {'collaborators': {'$exists': True}}]},
+        {'applications': 1, 'collaborators': 1}
+    ).batch_size(BATCH_SIZE)
+    for doc in cursor:
+        app_ops = _upsert_ops(doc['_id'], doc.get('applications') or [], ('message', 'applied_at', 'status'))
+        collab_ops = _upsert_ops(doc['_id'], doc.get('collaborators') or [], ('role', 'joined_at', 'status'))
+        if app_ops:
+            applications.bulk_write(app_ops, ordered=False)
+        if collab_ops:
+            collaborators.bulk_write(collab_ops, ordered=False)
+
+        # Counters come from the collections so they stay right on reruns
+        pending = applications.count_documents({'project': doc['_id'], 'status': 'pending'})
+        total = applications.count_documents({'project': doc['_id']})
+        members = collaborators.count_documents({'project': doc['_id'], 'status': {'$in': ['accepted', 'active']}})
+        projects.update_one({'_id': doc['_id']}, {
+            '$set': {
+                'applicant_count': total,
+                'pending_application_count': pending,
+                'collaborator_count': members,
+                'team_size.current': 1 + members,
+                'updated_at': now,
+            },
+            '$unset': {'applications': '', 'collaborators': ''},
+        })
+        migrated += 1
+        if migrated % BATCH_SIZE == 0:
+            print(f"  … {migrated} projects")
+    return migrated
+
+
+if __name__ == '__main__':
+    connect(host=MONGODB_URI)
+    try:
+        Project.ensure_indexes()
+        ProjectApplication.ensure_indexes()
+        ProjectCollaborator.ensure_indexes()
+        print(f"📋 Projects migrated: {migrate()}")
+    finally:
+        disconnect()
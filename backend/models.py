@@ -1,9 +1,14 @@
 import bcrypt
+import hashlib
 from datetime import datetime, timedelta, timezone # Import timezone
 from mongoengine import (
     Document, StringField, IntField, FloatField, BooleanField, DateTimeField,
-    ListField, ReferenceField, EmbeddedDocument, EmbeddedDocumentField, MapField
+    ListField, ReferenceField, EmbeddedDocument, EmbeddedDocumentField, MapField, ObjectIdField, DictField
 )
+from mongoengine.errors import NotUniqueError
+
+from metrics import track_bcrypt
+from skills import normalize_skill
 
 # ----------------- Sub-documents -----------------
 
@@ -14,11 +19,19 @@ def _aware(dt):
         return None
     return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
 
+def _bcrypt_check(password, hashed):
+    with track_bcrypt('check'):
+        return bcrypt.checkpw(password, hashed)
+
 class RequiredSkill(EmbeddedDocument):
     skill = StringField()
+    skill_id = StringField() # Canonical id from skills.normalize_skill, set on validation
     level = StringField(choices=('beginner', 'intermediate', 'advanced', 'expert'), default='intermediate')
     required = BooleanField(default=True)
 
+    def clean(self):
+        self.skill_id = normalize_skill(self.skill)
+
 class ProjectTimeline(EmbeddedDocument):
     start_date = DateTimeField(tz_aware=True) # tz_aware=True
     end_date = DateTimeField(tz_aware=True) # tz_aware=True
@@ -39,18 +52,6 @@ class Attachment(EmbeddedDocument):
     url = StringField()
     type = StringField()
 
-class Collaborator(EmbeddedDocument):
-    user = ReferenceField('User')
-    role = StringField()
-    joined_at = DateTimeField(default=lambda: datetime.now(timezone.utc), tz_aware=True) # tz_aware=True
-    status = StringField(choices=('pending', 'accepted', 'active', 'left'), default='pending')
-
-class Application(EmbeddedDocument):
-    user = ReferenceField('User')
-    message = StringField(max_length=500)
-    applied_at = DateTimeField(default=lambda: datetime.now(timezone.utc), tz_aware=True) # tz_aware=True
-    status = StringField(choices=('pending', 'accepted', 'rejected'), default='pending')
-
 class Milestone(EmbeddedDocument):
     title = StringField()
     description = StringField()
@@ -64,8 +65,12 @@ class Rating(EmbeddedDocument):
 
 class Skill(EmbeddedDocument):
     name = StringField()
+    skill_id = StringField() # Canonical id from skills.normalize_skill, set on validation
     level = StringField(choices=('beginner', 'intermediate', 'advanced', 'expert'), default='intermediate')
 
+    def clean(self):
+        self.skill_id = normalize_skill(self.name)
+
 class PortfolioItem(EmbeddedDocument):
     title = StringField()
     description = StringField()
@@ -97,6 +102,18 @@ class Conversation(EmbeddedDocument):
     started_at = DateTimeField(tz_aware=True) # tz_aware=True
     last_message_at = DateTimeField(tz_aware=True) # tz_aware=True
     message_count = IntField(default=0)
+    # Maintained by conversations.append_message in the same update as message_count
+    last_message_id = ObjectIdField()
+    last_message_sender = ObjectIdField()
+    last_message_preview = StringField()
+    user1_unread = IntField(default=0)
+    user2_unread = IntField(default=0)
+
+class Message(EmbeddedDocument):
+    id = ObjectIdField(db_field='_id') # Time-ordered; history pages key off it
+    sender = ReferenceField('User')
+    body = StringField()
+    sent_at = DateTimeField(tz_aware=True) # tz_aware=True
 
 class Feedback(EmbeddedDocument):
     from_user = ReferenceField('User')
@@ -119,6 +136,20 @@ class TeamSize(EmbeddedDocument):
 
 # ----------------- Main Documents -----------------
 
+# Weights used by Project.calculate_match_score (project fit for a user)
+MATCH_SCORE_WEIGHTS = {'category': 40, 'skills': 30, 'user_type': 20, 'rating': 10}
+# Weights used by User.calculate_compatibility (user-to-user fit); factors are scored 0..1
+COMPATIBILITY_WEIGHTS = {'categories': 30, 'user_type': 25, 'experience': 20, 'rating': 15, 'activity': 10}
+# Weights used by Project.calculate_candidate_score (contributor fit for a project)
+CANDIDATE_SCORE_WEIGHTS = {'skills': 35, 'category': 20, 'work_style': 10, 'location': 10, 'rating': 25}
+
+
+def weighted_compatibility(factors, weights=None):
+    """0..100 score from User.compatibility_factors; ``weights`` defaults to COMPATIBILITY_WEIGHTS."""
+    weights = weights or COMPATIBILITY_WEIGHTS
+    return min(100, max(0, sum(weights[name] * value for name, value in factors.items())))
+
+
 class User(Document):
     name = StringField(required=True, max_length=100)
     email = StringField(required=True, unique=True, lowercase=True)
@@ -143,6 +174,8 @@ class User(Document):
     updated_at = DateTimeField(auto_now=True, tz_aware=True)    # tz_aware=True
     likes_given = ListField(ReferenceField('User'), default=[])
     likes_received = ListField(ReferenceField('User'), default=[])
+    # Bumped on every profile update; per-user caches and ETags key on it
+    profile_version = IntField(default=0)
     
     meta = {
         'indexes': [
@@ -150,6 +183,7 @@ class User(Document):
             'location',
             'categories',
             'user_type',
+            'skills.skill_id',
             'rating.average',
             'last_active',
             'created_at',
@@ -161,8 +195,13 @@ class User(Document):
     def save(self, *args, **kwargs):
         # Only hash password if it's new or has been modified and is not already hashed
         if self.password and (self.pk is None or self.is_changed('password')) and \
-           not (self.password.startswith('$2a$') and len(self.password) > 20 and bcrypt.checkpw(b'test_password_for_check', self.password.encode('utf-8'))): # Basic check to avoid re-hashing already hashed passwords
-            self.password = bcrypt.hashpw(self.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+           not (self.password.startswith('$2a$') and len(self.password) > 20 and _bcrypt_check(b'test_password_for_check', self.password.encode('utf-8'))): # Basic check to avoid re-hashing already hashed passwords
+            with track_bcrypt('hash'):
+                self.password = bcrypt.hashpw(self.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        # auto_now/auto_now_add are not mongoengine options; stamp the times ETags are derived from here
+        now_utc = datetime.now(timezone.utc)
+        self.created_at = _aware(self.created_at) or now_utc
+        self.updated_at = now_utc
         super(User, self).save(*args, **kwargs)
 
     def to_public_dict(self):
@@ -200,55 +239,66 @@ class User(Document):
             
         return round((score / 9) * 100)
 
+    def missing_profile_fields(self):
+        """Fields that must be filled before the user can create or browse projects."""
+        required_fields = ['name', 'user_type', 'bio', 'experience', 'location']
+        missing_fields = [field for field in required_fields if not getattr(self, field)]
+        if not self.categories:
+            missing_fields.append('categories')
+        return missing_fields
+
     def compare_password(self, candidate_password):
         # Ensure password is not None before attempting to decode/check
         if self.password is None:
             return False
         try:
-            return bcrypt.checkpw(candidate_password.encode('utf-8'), self.password.encode('utf-8'))
+            return _bcrypt_check(candidate_password.encode('utf-8'), self.password.encode('utf-8'))
         except ValueError: # Handle cases where stored password might not be a valid bcrypt hash
             return False
 
     def update_last_active(self):
+        # Buffered: the tracker flushes one coalesced $max update per user per interval
+        from write_behind import activity_tracker
         self.last_active = datetime.now(timezone.utc) # Ensure this is also timezone aware
-        self.save()
+        activity_tracker.record(self.id, self.last_active)
 
-    def calculate_compatibility(self, other_user):
-        score = 0
-        
-        # Category overlap (30% weight)
+    def compatibility_factors(self, other_user):
+        """Per-factor scores in 0..1 behind calculate_compatibility, keyed like COMPATIBILITY_WEIGHTS."""
+        # Category overlap
         category_overlap = len(set(self.categories).intersection(other_user.categories))
-        category_score = (category_overlap / max(len(self.categories), len(other_user.categories), 1)) * 30
-        score += category_score
+        categories = category_overlap / max(len(self.categories), len(other_user.categories), 1)
         
-        # User type compatibility (25% weight)
-        type_score = 0
+        # User type compatibility
+        user_type = 0.0
         if self.user_type == 'both' or other_user.user_type == 'both':
-            type_score = 25
+            user_type = 1.0
         elif (self.user_type == 'creator' and other_user.user_type == 'contributor') or \
              (self.user_type == 'contributor' and other_user.user_type == 'creator'):
-            type_score = 25
-        score += type_score
+            user_type = 1.0
         
-        # Experience compatibility (20% weight)
-        experience_score = 0
-        if self.experience and other_user.experience and self.experience == other_user.experience:
-             experience_score = 20
-        score += experience_score
+        # Experience compatibility
+        experience = 1.0 if self.experience and other_user.experience and self.experience == other_user.experience else 0.0
         
-        # Rating factor (15% weight)
-        rating_score = (other_user.rating.average / 5) * 15 if other_user.rating else 0
-        score += rating_score
+        # Rating factor
+        rating = (other_user.rating.average or 0) / 5 if other_user.rating else 0.0
         
-        # Activity factor (10% weight)
+        # Activity factor: full marks today, nothing after 10 days
         # Ensure consistent timezone for comparison
         now_utc = datetime.now(timezone.utc)
         last_active_aware = _aware(getattr(other_user, "last_active", None)) or now_utc
         days_since_active = (now_utc - last_active_aware).days
-        activity_score = max(0, 10 - days_since_active) * 1
-        score += activity_score
+        activity = max(0, 10 - days_since_active) / 10
         
-        return min(100, max(0, score))
+        return {
+            'categories': categories,
+            'user_type': user_type,
+            'experience': experience,
+            'rating': rating,
+            'activity': activity,
+        }
+
+    def calculate_compatibility(self, other_user):
+        return weighted_compatibility(self.compatibility_factors(other_user))
 
 
 class Project(Document):
@@ -266,8 +316,11 @@ class Project(Document):
     work_style = StringField(choices=['remote', 'in-person', 'hybrid'], default='remote')
     tags = ListField(StringField())
     attachments = ListField(EmbeddedDocumentField(Attachment))
-    collaborators = ListField(EmbeddedDocumentField(Collaborator))
-    applications = ListField(EmbeddedDocumentField(Application))
+    # Applications and collaborators live in their own collections; these counters
+    # (and team_size.current) are maintained atomically by their transitions
+    applicant_count = IntField(default=0)
+    pending_application_count = IntField(default=0)
+    collaborator_count = IntField(default=0)
     milestones = ListField(EmbeddedDocumentField(Milestone))
     rating = EmbeddedDocumentField(Rating)
     views = IntField(default=0)
@@ -277,14 +330,19 @@ class Project(Document):
     updated_at = DateTimeField(auto_now=True, tz_aware=True)   # tz_aware=True
     
     meta = {
+        # Documents not yet run through migrate_applications.py still carry the old arrays
+        'strict': False,
         'indexes': [
             ('category', 'subcategory'),
             'status',
             'creator',
+            ('creator', 'status', '-created_at'),
             'created_at',
             'rating.average',
             ('featured', 'created_at'),
             'tags',
+            'required_skills.skill_id',
+            ('status', 'category'),
             {
                 'fields': ['$title', '$description', '$tags'],
                 'default_language': 'english',
@@ -292,13 +350,13 @@ class Project(Document):
             }
         ]
     }
-    
-    # Pre-save hook to update team size
-    def save(self, *args, **kwargs):
-        if self.collaborators:
-            self.team_size.current = 1 + len([c for c in self.collaborators if c.status in ['active', 'accepted']])
-        super(Project, self).save(*args, **kwargs)
 
+    def save(self, *args, **kwargs):
+        now_utc = datetime.now(timezone.utc)
+        self.created_at = _aware(self.created_at) or now_utc
+        self.updated_at = now_utc
+        return super(Project, self).save(*args, **kwargs)
+    
     # Virtual properties
     @property
     def completion_percentage(self):
@@ -316,49 +374,185 @@ class Project(Document):
     def available_spots(self):
         return self.team_size.target - self.team_size.current
 
+    @property
+    def creator_id(self):
+        """Creator's ObjectId without dereferencing the creator document."""
+        return _ref_id(self._data.get('creator'))
+
     # Instance methods
     def can_user_apply(self, user_id):
-        user_id_str = str(user_id)
-        if str(self.creator.id) == user_id_str:
+        if str(self.creator_id) == str(user_id):
             return False
-        
-        has_applied = any(str(app.user.id) == user_id_str for app in self.applications)
-        if has_applied:
+
+        if self.status != 'open' or self.available_spots <= 0:
             return False
-        
-        is_collaborator = any(str(collab.user.id) == user_id_str for collab in self.collaborators)
-        if is_collaborator:
+
+        # Point lookups on the unique (project, user) indexes
+        if ProjectApplication.objects(project=self.id, user=user_id).only('id').first():
             return False
-        
-        return self.status == 'open' and self.available_spots > 0
+        if ProjectCollaborator.objects(project=self.id, user=user_id).only('id').first():
+            return False
+
+        return True
 
     def calculate_match_score(self, user):
+        # recommendations.py mirrors this formula as an aggregation expression; keep them in sync
         score = 0
         
         # Category match (40% weight)
         if self.category in user.categories:
-            score += 40
+            score += MATCH_SCORE_WEIGHTS['category']
             
-        # Skills match (30% weight)
-        user_skills = {s.name.lower() for s in user.skills}
-        required_skills = {s.skill.lower() for s in self.required_skills}
+        # Skills match (30% weight), on canonical ids so "React" matches "React.js"
+        user_skills = {s.skill_id or normalize_skill(s.name) for s in user.skills} - {None}
+        required_skills = {s.skill_id or normalize_skill(s.skill) for s in self.required_skills} - {None}
         
         skill_matches = len(user_skills.intersection(required_skills))
         
         if required_skills:
-            score += (skill_matches / len(required_skills)) * 30
+            score += (skill_matches / len(required_skills)) * MATCH_SCORE_WEIGHTS['skills']
             
         # User type compatibility (20% weight)
         if user.user_type in ['contributor', 'both']:
-            score += 20
+            score += MATCH_SCORE_WEIGHTS['user_type']
             
         # Rating factor (10% weight)
         if user.rating:
-            score += (user.rating.average / 5) * 10
+            score += ((user.rating.average or 0) / 5) * MATCH_SCORE_WEIGHTS['rating']
             
         return min(100, max(0, score))
 
 
+    def calculate_candidate_score(self, user):
+        # recommendations.py mirrors this formula as an aggregation expression; keep them in sync
+        score = 0
+
+        # Skills coverage (35% weight)
+        required_skills = {s.skill_id or normalize_skill(s.skill) for s in self.required_skills} - {None}
+        user_skills = {s.skill_id or normalize_skill(s.name) for s in user.skills} - {None}
+        if required_skills:
+            score += (len(required_skills & user_skills) / len(required_skills)) * CANDIDATE_SCORE_WEIGHTS['skills']
+
+        # Category (20% weight)
+        if self.category in (user.categories or []):
+            score += CANDIDATE_SCORE_WEIGHTS['category']
+
+        # Work style (10% weight); hybrid on either side is a partial fit
+        preferred = user.preferences.work_style if user.preferences else None
+        if preferred == self.work_style:
+            score += CANDIDATE_SCORE_WEIGHTS['work_style']
+        elif 'hybrid' in (preferred, self.work_style):
+            score += CANDIDATE_SCORE_WEIGHTS['work_style'] / 2
+
+        # Location (10% weight): remote projects fit anyone
+        if self.work_style == 'remote' or \
+           (self.location and user.location and self.location.strip().lower() == user.location.strip().lower()):
+            score += CANDIDATE_SCORE_WEIGHTS['location']
+
+        # Rating (25% weight); unrated counts as 0, like $ifNull in recommendations.rank_candidates
+        if user.rating:
+            score += ((user.rating.average or 0) / 5) * CANDIDATE_SCORE_WEIGHTS['rating']
+
+        return min(100, max(0, score))
+
+    @property
+    def scoring_revision(self):
+        """Digest of the fields candidate ranking depends on; changes whenever a rerank is needed."""
+        required = sorted({s.skill_id or normalize_skill(s.skill) or '' for s in self.required_skills})
+        raw = '|'.join([self.category or '', self.work_style or '', (self.location or '').lower(), ','.join(required)])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
+
+def _ref_id(value):
+    """ObjectId of a reference field value, whether dereferenced or not."""
+    return getattr(value, 'id', value)
+
+
+class ProjectApplication(Document):
+    project = ReferenceField(Project, required=True)
+    user = ReferenceField(User, required=True)
+    message = StringField(max_length=500)
+    applied_at = DateTimeField(default=lambda: datetime.now(timezone.utc), tz_aware=True) # tz_aware=True
+    status = StringField(choices=('pending', 'accepted', 'rejected'), default='pending')
+    decided_at = DateTimeField(tz_aware=True)
+
+    meta = {
+        'indexes': [
+            {'fields': ('project', 'user'), 'unique': True},
+            ('project', 'status', 'applied_at'),
+            ('user', 'status')
+        ]
+    }
+
+    @classmethod
+    def apply(cls, project, user, message=None):
+        """Create a pending application; raises ValueError if the user cannot apply."""
+        if not project.can_user_apply(user.id):
+            raise ValueError('You cannot apply to this project')
+        try:
+            application = cls(project=project, user=user, message=message).save(force_insert=True)
+        except NotUniqueError:
+            # Lost a race with a concurrent apply from the same user
+            raise ValueError('You have already applied to this project')
+        Project.objects(id=project.id).update_one(inc__applicant_count=1, inc__pending_application_count=1,
+                                                  set__updated_at=datetime.now(timezone.utc))
+        return application
+
+    def accept(self, role=None):
+        """pending -> accepted, claiming a team spot; raises ValueError if not pending or the team is full."""
+        project_id = _ref_id(self._data['project'])
+        now = datetime.now(timezone.utc)
+        claimed = ProjectApplication.objects(id=self.id, status='pending').modify(
+            set__status='accepted', set__decided_at=now, new=True)
+        if not claimed:
+            raise ValueError('Application is not pending')
+
+        spot = Project._get_collection().update_one(
+            {'_id': project_id, '$expr': {'$lt': ['$team_size.current', '$team_size.target']}},
+            {'$inc': {'team_size.current': 1, 'collaborator_count': 1, 'pending_application_count': -1},
+             '$set': {'updated_at': now}})
+        if not spot.modified_count:
+            ProjectApplication.objects(id=self.id, status='accepted').update_one(
+                set__status='pending', unset__decided_at=True)
+            raise ValueError('Project team is already full')
+
+        user_id = _ref_id(self._data['user'])
+        ProjectCollaborator._get_collection().update_one(
+            {'project': project_id, 'user': user_id},
+            {'$set': {'status': 'accepted', 'role': role}, '$setOnInsert': {'joined_at': now}},
+            upsert=True)
+        self.reload()
+        return self
+
+    def reject(self):
+        """pending -> rejected; raises ValueError if not pending."""
+        project_id = _ref_id(self._data['project'])
+        now = datetime.now(timezone.utc)
+        claimed = ProjectApplication.objects(id=self.id, status='pending').modify(
+            set__status='rejected', set__decided_at=now, new=True)
+        if not claimed:
+            raise ValueError('Application is not pending')
+        Project.objects(id=project_id).update_one(dec__pending_application_count=1, set__updated_at=now)
+        self.reload()
+        return self
+
+
+class ProjectCollaborator(Document):
+    project = ReferenceField(Project, required=True)
+    user = ReferenceField(User, required=True)
+    role = StringField()
+    joined_at = DateTimeField(default=lambda: datetime.now(timezone.utc), tz_aware=True) # tz_aware=True
+    status = StringField(choices=('pending', 'accepted', 'active', 'left'), default='pending')
+
+    meta = {
+        'indexes': [
+            {'fields': ('project', 'user'), 'unique': True},
+            ('project', 'status'),
+            ('user', 'status')
+        ]
+    }
+
+
 class Match(Document):
     user1 = ReferenceField(User, required=True)
     user2 = ReferenceField(User, required=True)
@@ -442,7 +636,7 @@ class Match(Document):
         return cls.objects(__raw__=query).order_by('-created_at').select_related(1)
 
     @classmethod
-    def create_match(cls, user1_id, user2_id, project_id, initiated_by_id, compatibility_score, match_details):
+    def create_match(cls, user1_id, user2_id, project_id, initiated_by_id, compatibility_score, match_details, metadata=None):
         existing_match = cls.objects(__raw__={
             '$or': [{'user1': user1_id, 'user2': user2_id}, {'user1': user2_id, 'user2': user1_id}]
         }).first()
@@ -457,7 +651,8 @@ class Match(Document):
             'match_type': 'user-to-project' if project_id else 'user-to-user',
             'initiated_by': initiated_by_id,
             'compatibility_score': compatibility_score,
-            'match_details': match_details
+            'match_details': match_details,
+            'metadata': metadata
         }
         
         initial_action = MatchAction(action='like', timestamp=datetime.now(timezone.utc))
@@ -491,3 +686,110 @@ class Match(Document):
     def add_feedback(self, from_user_id, rating, comment):
         self.feedback.append(Feedback(from_user=from_user_id, rating=rating, comment=comment))
         self.save()
+
+
+class MessageBucket(Document):
+    """Up to MESSAGE_BUCKET_SIZE consecutive messages of one match's conversation.
+
+    Appends are a single upsert that $pushes into the match's open (not yet
+    full) bucket, so a burst of messages never rewrites the Match document or
+    a growing array.
+    """
+    match = ReferenceField(Match, required=True)
+    count = IntField(default=0)
+    first_id = ObjectIdField()
+    last_id = ObjectIdField()
+    messages = ListField(EmbeddedDocumentField(Message))
+
+    meta = {
+        'collection': 'message_buckets',
+        'indexes': [
+            ('match', 'count'),    # open-bucket lookup on append
+            ('match', '-last_id')  # newest-first history pages
+        ]
+    }
+
+
+class SwipeBatch(Document):
+    """Stored response of a /api/matches/actions batch, replayed when a client retries with the same key."""
+    user = ReferenceField(User, required=True)
+    key = StringField(required=True, max_length=100)
+    response = DictField()
+    created_at = DateTimeField(default=lambda: datetime.now(timezone.utc), tz_aware=True) # tz_aware=True
+
+    meta = {
+        'indexes': [
+            {'fields': ('user', 'key'), 'unique': True},
+            {'fields': ['created_at'], 'expireAfterSeconds': 24 * 60 * 60}
+        ]
+    }
+
+
+class MatchSuggestion(Document):
+    """One precomputed "people you may click with" entry, written by nightly_matches.py."""
+    user = ReferenceField(User, required=True)
+    suggested_user = ReferenceField(User, required=True)
+    score = FloatField(min_value=0, max_value=100)
+    rank = IntField()
+    match_details = EmbeddedDocumentField(MatchDetails)
+    metadata = EmbeddedDocumentField(Metadata)
+    run_id = StringField()
+    generated_at = DateTimeField(tz_aware=True) # tz_aware=True
+
+    meta = {
+        'collection': 'match_suggestions',
+        'indexes': [
+            {'fields': ('user', 'suggested_user'), 'unique': True},
+            ('user', 'rank'),
+            ('user', 'run_id')
+        ]
+    }
+
+
+class PipelineCheckpoint(Document):
+    """Progress of a resumable batch job, keyed by job name."""
+    id = StringField(primary_key=True)
+    run_id = StringField()
+    last_id = ObjectIdField() # Highest _id fully processed; the job resumes after it
+    processed = IntField(default=0)
+    started_at = DateTimeField(tz_aware=True) # tz_aware=True
+    updated_at = DateTimeField(tz_aware=True) # tz_aware=True
+    completed_at = DateTimeField(tz_aware=True) # tz_aware=True
+
+    meta = {'collection': 'pipeline_checkpoints'}
+
+
+class EngagementRollup(Document):
+    """Event counts for one UTC day and one slice of users, kept current by rollups.py.
+
+    ``dimension``/``value`` name the slice: ('all', 'all'), ('category', <category>),
+    ('user_type', <type>) or ('project', <project id>). ``counts`` maps metric
+    name to count.
+    """
+    day = StringField(required=True) # 'YYYY-MM-DD', so day ranges sort and compare as strings
+    dimension = StringField(required=True)
+    value = StringField(required=True)
+    counts = DictField()
+
+    meta = {
+        'collection': 'engagement_rollups',
+        'indexes': [
+            {'fields': ('dimension', 'value', 'day'), 'unique': True}
+        ]
+    }
+
+
+class CacheInvalidation(Document):
+    """One cache invalidation broadcast to every worker through a change stream (see invalidation.py)."""
+    topic = StringField(required=True)
+    key = StringField()
+    origin = StringField() # Publishing process, which has already applied it
+    at = DateTimeField(tz_aware=True) # tz_aware=True
+
+    meta = {
+        'collection': 'cache_invalidations',
+        'indexes': [
+            # Only needed while workers read the stream
+            {'fields': ['at'], 'expireAfterSeconds': 60 * 60}
+        ]
+    }
@@ -0,0 +1,44 @@
+"""Nightly match-suggestion run: top compatible users for every active user.
+
+    python nightly_matches.py                 # resume the last run if it did not finish
+    python nightly_matches.py --restart       # start over with a fresh snapshot
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+from mongoengine import connect, disconnect
+
+import suggestions
+
+load_dotenv()
+
+MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost/pairup')
+# Snapshot scored by this job; kept apart from FEATURE_STORE_PATH so the live store is never rebuilt mid-run
+NIGHTLY_STORE_PATH = os.environ.get('NIGHTLY_STORE_PATH', 'nightly_features.bin')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chunk-size', type=int, default=500, help='users scored per batch and checkpoint')
+    parser.add_argument('--top-k', type=int, default=20, help='suggestions kept per user')
+    parser.add_argument('--workers', type=int, default=None, help='scoring processes (default: all CPUs)')
+    parser.add_argument('--restart', action='store_true', help='ignore an unfinished run and start a new one')
+    parser.add_argument('--store', default=NIGHTLY_STORE_PATH)
+    args = parser.parse_args()
+
+    connect(host=MONGODB_URI)
+    try:
+        started = time.perf_counter()
+        processed, written = suggestions.run(args.store, chunk_size=args.chunk_size, top_k=args.top_k,
+                                             workers=args.workers, restart=args.restart)
+        print(f'🎉 Run complete: {processed} users, {written} suggestions written in {time.perf_counter() - started:.0f}s')
+    except KeyboardInterrupt:
+        print('⏸️ Interrupted; run again to resume from the last checkpoint')
+    finally:
+        disconnect()
+
+
+if __name__ == '__main__':
+    main()
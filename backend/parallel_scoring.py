@@ -0,0 +1,86 @@
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bson import ObjectId
+
+from feature_store import FeatureStore, compatibility, match_score
+
+SCORERS = {'compatibility': compatibility, 'match_score': match_score}
+
+_worker = {}
+
+
+def _available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _init_worker(path):
+    # Each pool process maps the store itself; the pages are shared through the page cache
+    _worker['store'] = FeatureStore(path)
+
+
+def _score_shard(scorer, start, stop, queries, k, excludes, now):
+    return _worker['store'].score_range(SCORERS[scorer], queries, start, stop, k, excludes, now)
+
+
+class ParallelScorer:
+    """Ranks feature-store records for many queries at once across a process pool.
+
+    The store's slot range is cut into ``chunk_size`` shards; every shard is
+    scored against all queries by one pool process, which returns only its
+    per-query top ``k``, and the shards are merged here. With ``workers=1``
+    shards are scored inline, which is the single-core baseline.
+    """
+
+    def __init__(self, path, workers=None, chunk_size=50000):
+        self.path = path
+        self.workers = workers or _available_cpus()
+        self.chunk_size = chunk_size
+        self._store = FeatureStore(path)
+        self._pool = None
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(path,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def top_k(self, scorer, queries, k, excludes=None):
+        """Per query, the best ``k`` (score, ObjectId), best first.
+
+        ``scorer`` is 'compatibility' (queries are feature_store.query_for
+        records) or 'match_score' (queries are feature_store.project_query
+        tuples); ``excludes`` is an optional list of ObjectId collections, one
+        per query.
+        """
+        if scorer not in SCORERS:
+            raise ValueError(f"unknown scorer: {scorer}")
+        excludes = [frozenset(ObjectId(e).binary for e in ex) for ex in excludes] if excludes else None
+        now = int(time.time())
+        total = len(self._store)
+        shards = [(start, min(start + self.chunk_size, total)) for start in range(0, total, self.chunk_size)]
+
+        if self._pool is None:
+            parts = (self._store.score_range(SCORERS[scorer], queries, start, stop, k, excludes, now)
+                     for start, stop in shards)
+        else:
+            parts = self._pool.map(_score_shard, *zip(*[
+                (scorer, start, stop, queries, k, excludes, now) for start, stop in shards])) if shards else []
+
+        merged = [[] for _ in queries]
+        for part in parts:
+            for i, ranked in enumerate(part):
+                merged[i] = heapq.nlargest(k, merged[i] + ranked)
+        return [[(score, ObjectId(raw)) for score, raw in ranked] for ranked in merged]
@@ -0,0 +1,67 @@
+from bson import ObjectId
+
+import invalidation
+from cache import LRUCache
+from models import User
+
+# Everything User.to_public_dict reads; nothing else leaves the database
+PUBLIC_FIELDS = ('name', 'avatar', 'user_type', 'categories', 'bio', 'experience', 'location',
+                 'rating', 'completed_projects', 'last_active', 'portfolio', 'skills')
+
+# Public profile dicts by user id, shared by every request in the process
+_cache = LRUCache('public_profiles', max_entries=50000, ttl=60)
+
+
+def init_app(app):
+    _cache.max_entries = app.config['PROFILE_CACHE_MAX_ENTRIES']
+    _cache.ttl = app.config['PROFILE_CACHE_TTL']
+
+
+def _public(user):
+    data = user.to_public_dict()
+    data['_id'] = user.id
+    return data
+
+
+def public_profiles(user_ids):
+    """Public profile dicts for ``user_ids`` (ObjectIds), keyed by id; unknown ids are absent.
+
+    Cache misses are resolved together with one projected $in query.
+    """
+    found, missing = {}, []
+    for user_id in user_ids:
+        cached = _cache.get(str(user_id))
+        if cached is not None:
+            found[user_id] = cached
+        else:
+            missing.append(user_id)
+    if missing:
+        for user in User.objects(id__in=missing).only(*PUBLIC_FIELDS):
+            found[user.id] = _public(user)
+            _cache.set(str(user.id), found[user.id])
+    return found
+
+
+def parse_ids(raw, limit):
+    """Split a comma-separated id list into distinct ObjectIds in request order; raises ValueError."""
+    ids = []
+    for part in (raw or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if not ObjectId.is_valid(part):
+            raise ValueError(f"Invalid user id: {part}")
+        oid = ObjectId(part)
+        if oid not in ids:
+            ids.append(oid)
+    if len(ids) > limit:
+        raise ValueError(f"At most {limit} ids per request")
+    return ids
+
+
+def invalidate(user_id):
+    """Drop ``user_id``'s cached profile in every worker."""
+    invalidation.publish('profile', user_id)
+
+
+invalidation.register('profile', _cache.pop, _cache.clear)
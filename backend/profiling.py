@@ -0,0 +1,202 @@
+import cProfile
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+from flask import g, request
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_MODES = ('cprofile', 'sample')
+
+
+def admin_token_matches(app, supplied):
+    token = app.config.get('ADMIN_TOKEN')
+    return bool(token and supplied and hmac.compare_digest(token, supplied))
+
+
+# ----------------- Request profilers -----------------
+
+class _CProfileSession:
+    """Deterministic profile of the request thread, saved as a pstats file."""
+    suffix = 'prof'
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self, path):
+        self._profile.disable()
+        self._profile.dump_stats(path)
+
+
+class _SamplingSession:
+    """Samples the request thread's stack on a timer and writes collapsed
+    stacks (one "frame;frame;frame count" line per stack), which flamegraph.pl
+    and speedscope load directly."""
+    suffix = 'folded'
+
+    def __init__(self, interval):
+        self._interval = interval
+        self._target = threading.get_ident()
+        self._stacks = Counter()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='pairup-sampler', daemon=True)
+
+    def _run(self):
+        while not self._done.wait(self._interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self._stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, path):
+        self._done.set()
+        self._thread.join()
+        with open(path, 'w') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _finish(app, session):
+    directory = app.config['PROFILE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    name = f"{request.endpoint}-{stamp}-{os.getpid()}.{session.suffix}"
+    session.stop(os.path.join(directory, name))
+    return name
+
+
+def init_app(app):
+    """Enable on-demand profiling of allow-listed endpoints.
+
+    A request carrying ``X-Profile: cprofile|sample`` plus a valid
+    ``X-Admin-Token`` runs under the chosen profiler and the output file name
+    is returned in the ``X-Profile-Output`` header. When PROFILING_ENABLED is
+    off (the default) no hooks are registered at all.
+    """
+    if not (app.config.get('PROFILING_ENABLED') and app.config.get('ADMIN_TOKEN')):
+        return
+
+    endpoints = set(app.config['PROFILING_ENDPOINTS'])
+
+    @app.before_request
+    def _start_profile():
+        mode = request.headers.get(PROFILE_HEADER)
+        if not mode or request.endpoint not in endpoints:
+            return
+        if mode not in PROFILE_MODES or not admin_token_matches(app, request.headers.get('X-Admin-Token')):
+            return
+        if mode == 'sample':
+            session = _SamplingSession(app.config['PROFILE_SAMPLE_INTERVAL'])
+        else:
+            session = _CProfileSession()
+        g._profile_session = session
+        session.start()
+
+    @app.after_request
+    def _stop_profile(resp):
+        session = g.pop('_profile_session', None)
+        if session is not None:
+            resp.headers['X-Profile-Output'] = _finish(app, session)
+        return resp
+
+    @app.teardown_request
+    def _abandon_profile(exc):
+        # after_request is skipped on unhandled errors; still stop and save
+        session = g.pop('_profile_session', None)
+        if session is not None:
+            _finish(app, session)
+
+
+def list_profiles(directory):
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            entries.append({'name': name, 'size': os.path.getsize(path),
+                            'createdAt': datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).isoformat()})
+    return entries
+
+
+# ----------------- tracemalloc snapshots (per worker) -----------------
+
+MAX_SNAPSHOTS = 10
+_snapshots = OrderedDict()
+_snapshot_lock = threading.Lock()
+
+
+def take_snapshot(label=None, frames=1):
+    """Start tracemalloc if needed and keep a labelled snapshot in this worker."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    label = label or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    with _snapshot_lock:
+        _snapshots[label] = (time.time(), snapshot)
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return _snapshot_info(label)
+
+
+def _snapshot_info(label):
+    taken_at, snapshot = _snapshots[label]
+    return {
+        'label': label,
+        'takenAt': datetime.fromtimestamp(taken_at, timezone.utc).isoformat(),
+        'totalBytes': sum(stat.size for stat in snapshot.statistics('filename')),
+    }
+
+
+def list_snapshots():
+    with _snapshot_lock:
+        return [_snapshot_info(label) for label in _snapshots]
+
+
+def diff_snapshots(old_label=None, new_label=None, key_type='lineno', limit=25):
+    """Compare two snapshots (default: the two most recent). Raises KeyError for unknown labels."""
+    with _snapshot_lock:
+        labels = list(_snapshots)
+        if old_label is None and new_label is None:
+            if len(labels) < 2:
+                raise KeyError('need at least two snapshots')
+            old_label, new_label = labels[-2], labels[-1]
+        old = _snapshots[old_label][1]
+        new = _snapshots[new_label][1]
+    stats = new.compare_to(old, key_type)
+    return {
+        'from': old_label,
+        'to': new_label,
+        'stats': [{
+            'location': str(stat.traceback),
+            'sizeBytes': stat.size,
+            'sizeDiffBytes': stat.size_diff,
+            'count': stat.count,
+            'countDiff': stat.count_diff,
+        } for stat in stats[:limit]],
+    }
+
+
+def stop_tracing():
+    with _snapshot_lock:
+        _snapshots.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
@@ -0,0 +1,235 @@
+import base64
+import json
+
+from bson import ObjectId
+
+import invalidation
+import text_index
+from cache import LRUCache
+from discovery import CANDIDATE_FIELDS, serialize_user
+from models import User, Project, ProjectApplication, ProjectCollaborator, MATCH_SCORE_WEIGHTS, CANDIDATE_SCORE_WEIGHTS
+from skills import normalize_skill
+
+# Text-similar projects added to the indexed category/skill prefilter
+TEXT_CANDIDATES = 200
+
+# Ranked contributor pages per (project, scoring revision, cursor, limit)
+_candidate_cache = LRUCache('project_candidates', max_entries=5000, ttl=600)
+
+
+def encode_cursor(score, doc_id):
+    raw = json.dumps({'s': score, 'id': str(doc_id)}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return (score, ObjectId) from an opaque cursor; raises ValueError when malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(data['s']), ObjectId(data['id'])
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {e}")
+
+
+def _user_skill_ids(user):
+    return sorted({s.skill_id or normalize_skill(s.name) for s in (user.skills or [])} - {None})
+
+
+def _user_constant_score(user):
+    """Parts of calculate_match_score that depend only on the user."""
+    score = 0
+    if user.user_type in ['contributor', 'both']:
+        score += MATCH_SCORE_WEIGHTS['user_type']
+    if user.rating:
+        score += ((user.rating.average or 0) / 5) * MATCH_SCORE_WEIGHTS['rating']
+    return score
+
+
+def _project_score_expr(categories, skill_ids):
+    """The project-dependent part of Project.calculate_match_score as an
+    aggregation expression, evaluated by the server for the whole batch."""
+    required = {'$setDifference': [{'$setUnion': [{'$ifNull': ['$required_skills.skill_id', []]}, []]}, [None]]}
+    return {'$add': [
+        {'$cond': [{'$in': ['$category', {'$literal': categories}]}, MATCH_SCORE_WEIGHTS['category'], 0]},
+        {'$let': {
+            'vars': {'req': required},
+            'in': {'$cond': [
+                {'$gt': [{'$size': '$$req'}, 0]},
+                {'$multiply': [
+                    {'$divide': [{'$size': {'$setIntersection': ['$$req', {'$literal': skill_ids}]}}, {'$size': '$$req'}]},
+                    MATCH_SCORE_WEIGHTS['skills'],
+                ]},
+                0,
+            ]},
+        }},
+    ]}
+
+
+def recommend_projects(user, limit=20, cursor=None):
+    """Top open projects for ``user`` that they can apply to, best match first.
+
+    Candidates come from indexed prefilters (my categories, my canonical
+    skills, text-similar projects); apply-eligibility is part of the same
+    query. The server scores, sorts and keeps only ``limit + 1`` documents, so
+    memory stays bounded however many projects are open. Returns
+    (projects with ``matchScore``, next cursor or None).
+    """
+    categories = list(user.categories or [])
+    skill_ids = _user_skill_ids(user)
+
+    prefilter = []
+    if categories:
+        prefilter.append({'category': {'$in': categories}})
+    if skill_ids:
+        prefilter.append({'required_skills.skill_id': {'$in': skill_ids}})
+    similar = text_index.similar_projects(user, TEXT_CANDIDATES)
+    if similar:
+        prefilter.append({'_id': {'$in': [ObjectId(p) for p in similar]}})
+    if not prefilter:
+        return [], None
+
+    # Same conditions as Project.can_user_apply, expressed against indexed fields;
+    # my applications/collaborations come from the (user, status) indexes
+    joined = set(ProjectApplication._get_collection().distinct('project', {'user': user.id})) | \
+        set(ProjectCollaborator._get_collection().distinct('project', {'user': user.id}))
+    match = {
+        '$or': prefilter,
+        'status': 'open',
+        'is_public': True,
+        'creator': {'$ne': user.id},
+        '_id': {'$nin': list(joined)},
+        '$expr': {'$lt': [{'$ifNull': ['$team_size.current', 1]}, '$team_size.target']},
+    }
+
+    pipeline = [
+        {'$match': match},
+        {'$project': {'score': _project_score_expr(categories, skill_ids)}},
+    ]
+    if cursor:
+        after_score, after_id = decode_cursor(cursor)
+        pipeline.append({'$match': {'$or': [
+            {'score': {'$lt': after_score}},
+            {'score': after_score, '_id': {'$gt': after_id}},
+        ]}})
+    pipeline += [
+        {'$sort': {'score': -1, '_id': 1}},
+        {'$limit': limit + 1},
+    ]
+    rows = list(Project.objects.aggregate(pipeline))
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    projects_by_id = {p.id: p for p in Project.objects(id__in=[r['_id'] for r in rows])}
+
+    constant = _user_constant_score(user)
+    results = []
+    for row in rows:
+        project = projects_by_id.get(row['_id'])
+        if project:
+            results.append((project, min(100, max(0, row['score'] + constant))))
+
+    next_cursor = encode_cursor(rows[-1]['score'], rows[-1]['_id']) if has_more and rows else None
+    return results, next_cursor
+
+
+# ----------------- Project-to-user matching -----------------
+
+def _candidate_score_expr(project, required):
+    """Project.calculate_candidate_score as an aggregation expression over User documents."""
+    w = CANDIDATE_SCORE_WEIGHTS
+    if required:
+        skills = {'$multiply': [
+            {'$divide': [{'$size': {'$setIntersection': [{'$ifNull': ['$skills.skill_id', []]}, {'$literal': required}]}},
+                         len(required)]},
+            w['skills'],
+        ]}
+    else:
+        skills = 0
+
+    preferred = {'$ifNull': ['$preferences.work_style', None]}
+    work_style = {'$cond': [
+        {'$eq': [preferred, project.work_style]},
+        w['work_style'],
+        {'$cond': [{'$or': [{'$eq': [preferred, 'hybrid']}, project.work_style == 'hybrid']}, w['work_style'] / 2, 0]},
+    ]}
+
+    if project.work_style == 'remote':
+        location = w['location']
+    elif project.location:
+        user_location = {'$toLower': {'$trim': {'input': {'$ifNull': ['$location', '']}}}}
+        location = {'$cond': [{'$eq': [user_location, {'$literal': project.location.strip().lower()}]}, w['location'], 0]}
+    else:
+        location = 0
+
+    return {'$add': [
+        skills,
+        {'$cond': [{'$in': [{'$literal': project.category}, {'$ifNull': ['$categories', []]}]}, w['category'], 0]},
+        work_style,
+        location,
+        {'$multiply': [{'$divide': [{'$ifNull': ['$rating.average', 0]}, 5]}, w['rating']]},
+    ]}
+
+
+def rank_candidates(project, limit=20, cursor=None):
+    """Contributors ranked for ``project`` by calculate_candidate_score, best first.
+
+    Retrieval goes through the category and skill indexes on User; existing
+    applicants, collaborators and the creator are excluded. Pages are cached
+    per project scoring revision. Returns (list of (user card, score), next cursor).
+    """
+    key = (str(project.id), project.scoring_revision, cursor or '', limit)
+    cached = _candidate_cache.get(key)
+    if cached is not None:
+        return cached
+
+    excluded = [project.creator_id] + \
+        ProjectApplication._get_collection().distinct('user', {'project': project.id}) + \
+        ProjectCollaborator._get_collection().distinct('user', {'project': project.id})
+    required = sorted({s.skill_id or normalize_skill(s.skill) for s in project.required_skills} - {None})
+
+    prefilter = [{'categories': project.category}]
+    if required:
+        prefilter.append({'skills.skill_id': {'$in': required}})
+    pipeline = [
+        {'$match': {
+            '$or': prefilter,
+            'is_active': True,
+            'user_type': {'$in': ['contributor', 'both']},
+            '_id': {'$nin': excluded},
+        }},
+        {'$project': {'score': _candidate_score_expr(project, required)}},
+    ]
+    if cursor:
+        after_score, after_id = decode_cursor(cursor)
+        pipeline.append({'$match': {'$or': [
+            {'score': {'$lt': after_score}},
+            {'score': after_score, '_id': {'$gt': after_id}},
+        ]}})
+    pipeline += [
+        {'$sort': {'score': -1, '_id': 1}},
+        {'$limit': limit + 1},
+    ]
+    rows = list(User.objects.aggregate(pipeline))
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    users_by_id = {u.id: u for u in User.objects(id__in=[r['_id'] for r in rows]).only(*CANDIDATE_FIELDS)}
+    ranked = [(serialize_user(users_by_id[r['_id']]), min(100, max(0, r['score'])))
+              for r in rows if r['_id'] in users_by_id]
+
+    next_cursor = encode_cursor(rows[-1]['score'], rows[-1]['_id']) if has_more and rows else None
+    result = (ranked, next_cursor)
+    _candidate_cache.set(key, result)
+    return result
+
+
+def invalidate_candidates(project_id):
+    """Drop ``project_id``'s cached candidate pages in every worker, e.g. after its applicants change."""
+    invalidation.publish('project_candidates', project_id)
+
+
+def _drop_project(project_id):
+    _candidate_cache.pop_where(lambda key: key[0] == project_id)
+
+
+invalidation.register('project_candidates', _drop_project, _candidate_cache.clear)
@@ -0,0 +1,171 @@
+"""Re-rank stored compatibility factors under new weight sets and report rank changes.
+
+    python reweight_matches.py --weights categories=40,activity=0 --weights rating=25
+    python reweight_matches.py --source matches --save factors.bin      # snapshot once ...
+    python reweight_matches.py --load factors.bin --weights user_type=35  # ... experiment offline
+"""
+import argparse
+import json
+import os
+import time
+from array import array
+
+from dotenv import load_dotenv
+
+from models import COMPATIBILITY_WEIGHTS, Match, MatchSuggestion
+
+load_dotenv()
+
+MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost/pairup')
+FACTORS = tuple(COMPATIBILITY_WEIGHTS)
+BATCH_SIZE = 5000
+
+# Where each source keeps its factors, and whose point of view they were scored from
+SOURCES = {
+    'suggestions': (MatchSuggestion, 'user'),
+    'matches': (Match, 'initiated_by'),
+}
+
+
+class FactorTable:
+    """Factor scores of many (user, candidate) pairs as one float column per factor.
+
+    ``groups`` holds a small int per pair naming whose ranking it belongs to;
+    ``order`` lists pair indexes grouped by that int, with ``bounds`` marking
+    where each group starts, so re-ranking never touches Mongo or dicts.
+    """
+
+    def __init__(self, groups, columns):
+        self.groups = groups
+        self.columns = columns
+        self.order = array('I', sorted(range(len(groups)), key=groups.__getitem__))
+        self.bounds = array('I', [0])
+        for i in range(1, len(self.order)):
+            if groups[self.order[i]] != groups[self.order[i - 1]]:
+                self.bounds.append(i)
+        if self.order:
+            self.bounds.append(len(self.order))
+
+    def __len__(self):
+        return len(self.groups)
+
+    @property
+    def group_count(self):
+        return max(0, len(self.bounds) - 1)
+
+    @classmethod
+    def from_collection(cls, source):
+        document, owner = SOURCES[source]
+        ids, groups = {}, array('I')
+        columns = {name: array('f') for name in FACTORS}
+        query = {'metadata.factors.0': {'$exists': True}}
+        rows = document._get_collection().find(query, {owner: 1, 'metadata.factors': 1}).batch_size(BATCH_SIZE)
+        for row in rows:
+            scores = {f.get('name'): f.get('score') or 0.0 for f in row['metadata']['factors']}
+            groups.append(ids.setdefault(row[owner], len(ids)))
+            for name in FACTORS:
+                columns[name].append(scores.get(name, 0.0))
+        return cls(groups, columns)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(json.dumps({'factors': FACTORS, 'pairs': len(self)}).encode('utf-8') + b'\n')
+            self.groups.tofile(f)
+            for name in FACTORS:
+                self.columns[name].tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            groups = array('I')
+            groups.fromfile(f, header['pairs'])
+            columns = {}
+            for name in header['factors']:
+                columns[name] = array('f')
+                columns[name].fromfile(f, header['pairs'])
+        return cls(groups, {name: columns.get(name, array('f', bytes(4 * header['pairs']))) for name in FACTORS})
+
+    def scores(self, weights):
+        """Unclamped weighted score per pair, in pair order."""
+        w = [float(weights[name]) for name in FACTORS]
+        cols = [self.columns[name] for name in FACTORS]
+        return array('d', [w[0] * a + w[1] * b + w[2] * c + w[3] * d + w[4] * e for a, b, c, d, e in zip(*cols)])
+
+    def ranks(self, scores):
+        """1-based rank of each pair within its group, best score first."""
+        ranks = array('I', bytes(4 * len(self)))
+        order, key = self.order, scores.__getitem__
+        for g in range(self.group_count):
+            ranked = sorted(order[self.bounds[g]:self.bounds[g + 1]], key=key, reverse=True)
+            for rank, i in enumerate(ranked, 1):
+                ranks[i] = rank
+        return ranks
+
+
+def compare(table, base_ranks, ranks, top):
+    """Rank-change summary between two rankings of the same table."""
+    moved = sum(abs(a - b) for a, b in zip(base_ranks, ranks))
+    top1_changed, overlap = 0, 0.0
+    order = table.order
+    for g in range(table.group_count):
+        members = order[table.bounds[g]:table.bounds[g + 1]]
+        before = {i for i in members if base_ranks[i] <= top}
+        after = {i for i in members if ranks[i] <= top}
+        overlap += len(before & after) / max(len(before), 1)
+        top1_changed += not any(base_ranks[i] == 1 and ranks[i] == 1 for i in members)
+    groups = max(table.group_count, 1)
+    return {
+        'mean_rank_change': moved / max(len(table), 1),
+        'top1_changed': top1_changed / groups,
+        'top_overlap': overlap / groups,
+    }
+
+
+def parse_weights(spec):
+    weights = dict(COMPATIBILITY_WEIGHTS)
+    for part in filter(None, spec.split(',')):
+        name, _, value = part.partition('=')
+        if name.strip() not in weights:
+            raise argparse.ArgumentTypeError(f"unknown factor '{name}' (expected one of {', '.join(FACTORS)})")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', choices=sorted(SOURCES), default='suggestions')
+    parser.add_argument('--load', help='read factors from a --save snapshot instead of MongoDB')
+    parser.add_argument('--save', help='write the loaded factors to this snapshot file')
+    parser.add_argument('--weights', type=parse_weights, action='append', default=[],
+                        help='factor=weight overrides of the current weights; repeat for several sets')
+    parser.add_argument('--top', type=int, default=10, help='list length for the top-N overlap')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.load:
+        table = FactorTable.load(args.load)
+    else:
+        from mongoengine import connect, disconnect
+        connect(host=MONGODB_URI)
+        try:
+            table = FactorTable.from_collection(args.source)
+        finally:
+            disconnect()
+    print(f'📥 {len(table)} pairs across {table.group_count} users loaded in {time.perf_counter() - started:.1f}s')
+    if args.save:
+        table.save(args.save)
+        print(f'💾 Saved to {args.save} ({os.path.getsize(args.save) // 1024} KiB)')
+
+    base_ranks = table.ranks(table.scores(COMPATIBILITY_WEIGHTS))
+    print(f"{'weights':<48} {'seconds':>8} {'mean Δrank':>11} {'top-1 changed':>14} {f'top-{args.top} kept':>11}")
+    for weights in args.weights:
+        started = time.perf_counter()
+        report = compare(table, base_ranks, table.ranks(table.scores(weights)), args.top)
+        label = ','.join(f'{name}={weights[name]:g}' for name in FACTORS)
+        print(f"{label:<48} {time.perf_counter() - started:>8.2f} {report['mean_rank_change']:>11.2f} "
+              f"{report['top1_changed']:>13.1%} {report['top_overlap']:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
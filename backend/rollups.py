@@ -0,0 +1,228 @@
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+
+from models import User, Project, Match, ProjectApplication, EngagementRollup
+from write_behind import rollup_counter
+
+METRICS = ('likes', 'passes', 'mutuals', 'applications', 'accepted')
+_SWIPE_METRICS = {'like': 'likes', 'pass': 'passes'}
+DIMENSIONS = ('all', 'category', 'user_type', 'project')
+INTERVALS = ('day', 'week')
+
+
+def day_of(when=None):
+    """UTC 'YYYY-MM-DD' for an aware or naive-UTC datetime (default now)."""
+    when = when or datetime.now(timezone.utc)
+    if when.tzinfo:
+        when = when.astimezone(timezone.utc)
+    return when.strftime('%Y-%m-%d')
+
+
+def _user_slices(categories, user_type):
+    slices = [('all', 'all')] + [('category', c) for c in categories or []]
+    if user_type:
+        slices.append(('user_type', user_type))
+    return slices
+
+
+def _application_slices(project_id, category, user_type):
+    slices = [('all', 'all'), ('project', str(project_id))]
+    if category:
+        slices.append(('category', category))
+    if user_type:
+        slices.append(('user_type', user_type))
+    return slices
+
+
+def swipe_events(match):
+    """(user id, day, metric) counted for one raw match document.
+
+    Each side's current like or pass counts once, on the day it was made; a
+    mutual match counts once more for whoever liked second, on that day.
+    Live counting and backfill both go through here so they agree.
+    """
+    events, likes = [], []
+    for side in ('user1', 'user2'):
+        action = match.get(f'{side}_action') or {}
+        metric = _SWIPE_METRICS.get(action.get('action'))
+        when = action.get('timestamp')
+        if not metric or not when:
+            continue
+        events.append((match[side], day_of(when), metric))
+        if metric == 'likes':
+            likes.append((when if when.tzinfo else when.replace(tzinfo=timezone.utc), side))
+    if match.get('status') == 'mutual' and len(likes) == 2:
+        when, side = max(likes)
+        events.append((match[side], day_of(when), 'mutuals'))
+    return events
+
+
+# ----------------- Write paths -----------------
+
+def record_match_change(before, after, users):
+    """Count what one swipe changed on a match: the events of ``after`` minus those of ``before``.
+
+    ``before`` and ``after`` are raw match documents (``before`` None for a
+    new match); ``users`` maps user ids to User documents for slicing. A
+    repeated swipe changes nothing, and a like turned into a pass moves the
+    count rather than adding one, so live rollups match a backfill.
+    """
+    delta = {}
+    for events, sign in ((swipe_events(before) if before else [], -1), (swipe_events(after), 1)):
+        for event in events:
+            delta[event] = delta.get(event, 0) + sign
+    for (user_id, day, metric), n in delta.items():
+        user = users.get(user_id)
+        if n and user is not None:
+            keys = [(day, dimension, value) for dimension, value in _user_slices(user.categories, user.user_type)]
+            rollup_counter.record(keys, metric, n)
+
+
+def record_application(project, applicant, metric='applications', when=None):
+    """Count an application event ('applications' or 'accepted') on ``project`` by ``applicant``."""
+    day = day_of(when)
+    slices = _application_slices(project.id, project.category, applicant.user_type)
+    rollup_counter.record([(day, dimension, value) for dimension, value in slices], metric)
+
+
+# ----------------- Reads -----------------
+
+def _period(day, interval):
+    if interval == 'day':
+        return day
+    date = datetime.strptime(day, '%Y-%m-%d')
+    return (date - timedelta(days=date.weekday())).strftime('%Y-%m-%d')  # week starts Monday
+
+
+def _with_rates(counts):
+    likes = counts.get('likes', 0)
+    counts['mutualRate'] = round(counts.get('mutuals', 0) / likes, 4) if likes else None
+    return counts
+
+
+def series(dimension, value=None, since=None, until=None, interval='day'):
+    """Counts per period for each value of ``dimension`` from rollup documents only.
+
+    Reads one document per (value, day) on the (dimension, value, day) index,
+    so cost grows with the days asked for, not with the events behind them.
+    ``since``/``until`` are inclusive 'YYYY-MM-DD' days.
+    """
+    query = {'dimension': dimension}
+    if value is not None:
+        query['value'] = value
+    if since or until:
+        query['day'] = {}
+        if since:
+            query['day']['$gte'] = since
+        if until:
+            query['day']['$lte'] = until
+
+    grouped = {}
+    rows = EngagementRollup._get_collection().find(query, {'value': 1, 'day': 1, 'counts': 1}).sort([('value', 1), ('day', 1)])
+    for row in rows:
+        points = grouped.setdefault(row['value'], {})
+        bucket = points.setdefault(_period(row['day'], interval), dict.fromkeys(METRICS, 0))
+        for metric, n in (row.get('counts') or {}).items():
+            bucket[metric] = bucket.get(metric, 0) + n
+
+    result = []
+    for slice_value, points in grouped.items():
+        totals = dict.fromkeys(METRICS, 0)
+        for counts in points.values():
+            for metric, n in counts.items():
+                totals[metric] = totals.get(metric, 0) + n
+        result.append({
+            "value": slice_value,
+            "totals": _with_rates(totals),
+            "points": [{"period": period, **_with_rates(counts)} for period, counts in sorted(points.items())],
+        })
+    return result
+
+
+# ----------------- Backfill -----------------
+
+def _batches(cursor, size):
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _in_range(day, since, until):
+    return (not since or day >= since) and (not until or day <= until)
+
+
+def _count_swipes(totals, since, until, batch_size):
+    matches = Match._get_collection().find(
+        {}, {'user1': 1, 'user2': 1, 'user1_action': 1, 'user2_action': 1, 'status': 1}).batch_size(batch_size)
+    for batch in _batches(matches, batch_size):
+        ids = {doc[side] for doc in batch for side in ('user1', 'user2')}
+        users = {u['_id']: _user_slices(u.get('categories'), u.get('user_type'))
+                 for u in User._get_collection().find({'_id': {'$in': list(ids)}}, {'categories': 1, 'user_type': 1})}
+        for doc in batch:
+            for user_id, day, metric in swipe_events(doc):
+                if user_id not in users or not _in_range(day, since, until):
+                    continue
+                for dimension, value in users[user_id]:
+                    key = (day, dimension, value, metric)
+                    totals[key] = totals.get(key, 0) + 1
+
+
+def _count_applications(totals, since, until, batch_size):
+    applications = ProjectApplication._get_collection().find(
+        {}, {'project': 1, 'user': 1, 'applied_at': 1, 'status': 1, 'decided_at': 1}).batch_size(batch_size)
+    for batch in _batches(applications, batch_size):
+        categories = {p['_id']: p.get('category') for p in Project._get_collection().find(
+            {'_id': {'$in': list({a['project'] for a in batch})}}, {'category': 1})}
+        user_types = {u['_id']: u.get('user_type') for u in User._get_collection().find(
+            {'_id': {'$in': list({a['user'] for a in batch})}}, {'user_type': 1})}
+        for application in batch:
+            events = [('applications', application.get('applied_at'))]
+            if application.get('status') == 'accepted':
+                events.append(('accepted', application.get('decided_at')))
+            slices = _application_slices(application['project'], categories.get(application['project']),
+                                         user_types.get(application['user']))
+            for metric, when in events:
+                if not when or not _in_range(day_of(when), since, until):
+                    continue
+                for dimension, value in slices:
+                    key = (day_of(when), dimension, value, metric)
+                    totals[key] = totals.get(key, 0) + 1
+
+
+def backfill(since=None, until=None, batch_size=1000):
+    """Recompute rollups from matches and applications for days in [since, until]; returns documents written.
+
+    Scans both collections once in batches, keeping only per-day totals in
+    memory, then overwrites the counts of every rollup in the range and
+    removes rollups in the range that no longer have any events.
+    """
+    totals = {}
+    _count_swipes(totals, since, until, batch_size)
+    _count_applications(totals, since, until, batch_size)
+
+    docs = {}
+    for (day, dimension, value, metric), n in totals.items():
+        docs.setdefault((day, dimension, value), {})[metric] = n
+    rollups = EngagementRollup._get_collection()
+    ops = [UpdateOne({'day': day, 'dimension': dimension, 'value': value}, {'$set': {'counts': counts}}, upsert=True)
+           for (day, dimension, value), counts in docs.items()]
+    for start in range(0, len(ops), batch_size):
+        rollups.bulk_write(ops[start:start + batch_size], ordered=False)
+
+    stale = {}
+    if since or until:
+        stale['day'] = {}
+        if since:
+            stale['day']['$gte'] = since
+        if until:
+            stale['day']['$lte'] = until
+    for row in rollups.find(stale, {'day': 1, 'dimension': 1, 'value': 1}):
+        if (row['day'], row['dimension'], row['value']) not in docs:
+            rollups.delete_one({'_id': row['_id']})
+    return len(docs)
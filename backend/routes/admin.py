@@ -0,0 +1,121 @@
+import os
+
+from flask import Blueprint, Response, current_app, jsonify, request, send_from_directory
+
+import exports
+import profiling
+import rollups
+from middleware import require_admin_token
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+@require_admin_token
+def list_profiles():
+    return jsonify({
+        "success": True,
+        "pid": os.getpid(),
+        "profiles": profiling.list_profiles(current_app.config['PROFILE_DIR'])
+    })
+
+
+@admin_bp.route('/profiles/<name>', methods=['GET'])
+@require_admin_token
+def download_profile(name):
+    return send_from_directory(current_app.config['PROFILE_DIR'], name, as_attachment=True)
+
+
+# tracemalloc state lives in each worker process; every response carries the
+# pid so repeated calls can be matched to the worker that served them.
+
+@admin_bp.route('/tracemalloc/snapshots', methods=['POST'])
+@require_admin_token
+def take_tracemalloc_snapshot():
+    data = request.get_json(silent=True) or {}
+    try:
+        frames = max(1, min(50, int(data.get('frames', 1))))
+    except (TypeError, ValueError):
+        frames = 1
+    snapshot = profiling.take_snapshot(data.get('label'), frames=frames)
+    return jsonify({"success": True, "pid": os.getpid(), "snapshot": snapshot}), 201
+
+
+@admin_bp.route('/tracemalloc/snapshots', methods=['GET'])
+@require_admin_token
+def list_tracemalloc_snapshots():
+    return jsonify({"success": True, "pid": os.getpid(), "snapshots": profiling.list_snapshots()})
+
+
+@admin_bp.route('/tracemalloc/diff', methods=['GET'])
+@require_admin_token
+def diff_tracemalloc_snapshots():
+    key_type = request.args.get('keyType', 'lineno')
+    if key_type not in ('lineno', 'filename', 'traceback'):
+        return jsonify({"success": False, "message": "keyType must be lineno, filename or traceback"}), 400
+    try:
+        limit = min(200, max(1, int(request.args.get('limit', 25))))
+    except ValueError:
+        limit = 25
+    try:
+        diff = profiling.diff_snapshots(request.args.get('from'), request.args.get('to'), key_type, limit)
+    except KeyError as e:
+        return jsonify({"success": False, "pid": os.getpid(), "message": f"Snapshot not found: {e}"}), 404
+    return jsonify({"success": True, "pid": os.getpid(), "diff": diff})
+
+
+@admin_bp.route('/tracemalloc', methods=['DELETE'])
+@require_admin_token
+def stop_tracemalloc():
+    profiling.stop_tracing()
+    return jsonify({"success": True, "pid": os.getpid()})
+
+
+@admin_bp.route('/exports/<kind>', methods=['GET'])
+@require_admin_token
+def export_collection(kind):
+    """Stream users, projects or matches as NDJSON or CSV (?format, ?fields, ?since, ?until, ?gzip=1)."""
+    if kind not in exports.EXPORTS:
+        return jsonify({"success": False, "message": f"Unknown export: {kind}"}), 404
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in exports.FORMATS:
+        return jsonify({"success": False, "message": "format must be ndjson or csv"}), 400
+    try:
+        fields = exports.parse_fields(kind, request.args.get('fields'))
+        since = exports.parse_date(request.args.get('since'))
+        until = exports.parse_date(request.args.get('until'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    gzip = request.args.get('gzip') in ('1', 'true')
+    filename = f"{kind}.{fmt}" + ('.gz' if gzip else '')
+    mimetype = 'application/gzip' if gzip else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    # The generator needs no request context; the cursor is read as the client downloads
+    return Response(exports.stream(kind, fmt, fields, since, until, gzip), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@admin_bp.route('/stats/engagement', methods=['GET'])
+@require_admin_token
+def engagement_stats():
+    """Likes, passes, mutuals and applications per day or week, read from rollups only.
+
+    ?dimension=all|category|user_type|project, ?value (one slice; default all
+    slices of the dimension), ?since/?until (YYYY-MM-DD, inclusive), ?interval=day|week.
+    """
+    dimension = request.args.get('dimension', 'all')
+    interval = request.args.get('interval', 'day')
+    if dimension not in rollups.DIMENSIONS:
+        return jsonify({"success": False, "message": f"dimension must be one of {', '.join(rollups.DIMENSIONS)}"}), 400
+    if interval not in rollups.INTERVALS:
+        return jsonify({"success": False, "message": "interval must be day or week"}), 400
+    try:
+        since, until = (exports.parse_date(request.args.get(k)) for k in ('since', 'until'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    series = rollups.series(dimension, request.args.get('value'), since and rollups.day_of(since),
+                            until and rollups.day_of(until), interval)
+    return jsonify({"success": True, "dimension": dimension, "interval": interval, "series": series})
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify, g
 from flask_jwt_extended import create_access_token, jwt_required
 from models import User
+import conditional
+import discovery
+import feature_store
 from bson import ObjectId # Import ObjectId
 from flask_jwt_extended import create_access_token
 
@@ -34,6 +37,8 @@ def register():
         # So we pass 'user_type=user_type' which uses the 'user_type' variable from data.get('userType').
         user = User(email=email, password=password, user_type=user_type, name=data.get('name')) # Pass name too
         user.save()
+        discovery.note_signup() # New candidate for everyone's discovery list, batched
+        feature_store.record_profile(user)
         access_token = create_access_token(identity=str(user.id))
         
         # Omit password from the response and convert ObjectIds
@@ -91,17 +96,21 @@ def get_current_user_profile():
         
         if not user:
             return jsonify({"success": False, "message": "User not found"}), 404
+
+        etag, modified = conditional.validators('me', user.updated_at, user.id, user.profile_version)
+        if conditional.is_fresh(etag, modified):
+            return conditional.not_modified(etag, modified, conditional.PRIVATE_REVALIDATE)
         
         # Prepare user data for response, removing sensitive info like password and converting ObjectIds
         user_data = user.to_mongo().to_dict()
         user_data.pop('password', None)
         user_data = convert_objectids_to_strings(user_data) # Apply conversion
         
-        return jsonify({
+        return conditional.with_validators(jsonify({
             "success": True,
             "user": user_data,
             "profileCompletion": user.profile_completion
-        }), 200
+        }), etag, modified, conditional.PRIVATE_REVALIDATE), 200
     except Exception as e:
         print(f"Get current user profile error: {e}")
         return jsonify({"success": False, "message": "Server error while fetching profile"}), 500
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, jsonify, g
+from flask_jwt_extended import jwt_required
+from bson import ObjectId
+
+import discovery
+from models import Match
+
+bootstrap_bp = Blueprint('bootstrap', __name__)
+
+# One pool per process, shared by every request; created by init_app. Threads are
+# only started on first submit, i.e. inside each worker process
+_executor = None
+
+DISCOVERY_PAGE_SIZE = 10
+
+
+def init_app(app):
+    global _executor
+    _executor = ThreadPoolExecutor(max_workers=app.config['BOOTSTRAP_WORKERS'],
+                                   thread_name_prefix='pairup-bootstrap')
+
+
+def convert_objectids_to_strings(obj):
+    """Recursively converts ObjectId instances in a dictionary or list to strings."""
+    if isinstance(obj, dict):
+        return {k: convert_objectids_to_strings(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_objectids_to_strings(elem) for elem in obj]
+    elif isinstance(obj, ObjectId):
+        return str(obj)
+    return obj
+
+
+def liked_me_count(user_id):
+    """Same rows as /api/matches/liked-me: they liked me, I have not liked back, not mutual."""
+    return Match._get_collection().count_documents({
+        'status': {'$ne': 'mutual'},
+        '$or': [
+            {'user1': user_id, 'user2_action.action': 'like', 'user1_action.action': {'$ne': 'like'}},
+            {'user2': user_id, 'user1_action.action': 'like', 'user2_action.action': {'$ne': 'like'}},
+        ],
+    })
+
+
+def mutual_count(user_id):
+    return Match._get_collection().count_documents({
+        'status': 'mutual',
+        '$or': [{'user1': user_id}, {'user2': user_id}],
+    })
+
+
+@bootstrap_bp.route('/', methods=['GET'], strict_slashes=False)
+@jwt_required()
+def bootstrap():
+    """Everything the app needs on launch in one round trip."""
+    user = g.user
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    try:
+        # The sub-queries are independent; each worker gets the user passed in, not g
+        liked_me = _executor.submit(liked_me_count, user.id)
+        mutual = _executor.submit(mutual_count, user.id)
+        discover = _executor.submit(discovery.discover_for, user, DISCOVERY_PAGE_SIZE)
+
+        user_data = user.to_mongo().to_dict()
+        user_data.pop('password', None)
+
+        return jsonify({
+            "success": True,
+            "user": convert_objectids_to_strings(user_data),
+            "profileCompletion": user.profile_completion,
+            "counts": {
+                "likedMe": liked_me.result(),
+                "mutualMatches": mutual.result()
+            },
+            "discovery": discover.result()
+        })
+    except Exception as e:
+        print(f"Server error in bootstrap: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
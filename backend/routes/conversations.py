@@ -0,0 +1,125 @@
+from bson import ObjectId
+from flask import Blueprint, jsonify, request, g
+from flask_jwt_extended import jwt_required
+
+import conversations
+import events
+from discovery import CANDIDATE_FIELDS, serialize_user
+from models import User
+
+conversations_bp = Blueprint('conversations', __name__)
+
+
+def _serialize_message(m):
+    return {
+        "_id": str(m['_id']),
+        "sender": str(m['sender']),
+        "body": m['body'],
+        "sentAt": m['sent_at'].isoformat() if m.get('sent_at') else None,
+    }
+
+
+@conversations_bp.route('/', methods=['GET'])
+@jwt_required()
+def list_conversations():
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        limit = min(50, max(1, int(request.args.get('limit', 20))))
+    except ValueError:
+        page, limit = 1, 20
+
+    try:
+        rows, total = conversations.list_for(g.user.id, skip=(page - 1) * limit, limit=limit)
+        other_ids = [r['user2'] if r['user1'] == g.user.id else r['user1'] for r in rows]
+        others = {u.id: u for u in User.objects(id__in=other_ids).only(*CANDIDATE_FIELDS)}
+
+        items = []
+        for row, other_id in zip(rows, other_ids):
+            conv = row.get('conversation') or {}
+            side = 'user1' if row['user1'] == g.user.id else 'user2'
+            last_at = conv.get('last_message_at')
+            items.append({
+                "matchId": f"{row['user1']}_{row['user2']}",
+                "otherUser": serialize_user(others[other_id]) if other_id in others else None,
+                "messageCount": conv.get('message_count', 0),
+                "unread": conv.get(f'{side}_unread', 0),
+                "lastMessage": {
+                    "sender": str(conv.get('last_message_sender')),
+                    "preview": conv.get('last_message_preview'),
+                    "sentAt": last_at.isoformat() if last_at else None,
+                },
+            })
+    except Exception as e:
+        print(f"Server error in list_conversations: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
+    return jsonify({
+        "success": True,
+        "conversations": items,
+        "pagination": {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "pages": (total + limit - 1) // limit
+        }
+    })
+
+
+@conversations_bp.route('/<match_id>/messages', methods=['GET'])
+@jwt_required()
+def get_messages(match_id):
+    try:
+        limit = min(100, max(1, int(request.args.get('limit', 50))))
+    except ValueError:
+        limit = 50
+    before = request.args.get('before')
+    if before is not None and not ObjectId.is_valid(before):
+        return jsonify({"success": False, "message": "before must be a message id"}), 400
+
+    try:
+        messages = conversations.history(match_id, g.user.id, before=ObjectId(before) if before else None, limit=limit)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        print(f"Server error in get_messages: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    if messages is None:
+        return jsonify({"success": False, "message": "Conversation not found"}), 404
+
+    return jsonify({
+        "success": True,
+        "messages": [_serialize_message(m) for m in messages],
+        # Pass back as ?before= for the next (older) page
+        "nextBefore": str(messages[-1]['_id']) if len(messages) == limit else None
+    })
+
+
+@conversations_bp.route('/<match_id>/messages', methods=['POST'])
+@jwt_required()
+def send_message(match_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        result = conversations.append_message(match_id, g.user.id, data.get('body'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        print(f"Server error in send_message: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    if result is None:
+        return jsonify({"success": False, "message": "Conversation not found"}), 404
+
+    message, match_row = result
+    events.notify_message(match_row, message)
+    return jsonify({"success": True, "message": _serialize_message(message)}), 201
+
+
+@conversations_bp.route('/<match_id>/read', methods=['POST'])
+@jwt_required()
+def mark_conversation_read(match_id):
+    try:
+        found = conversations.mark_read(match_id, g.user.id)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    if not found:
+        return jsonify({"success": False, "message": "Conversation not found"}), 404
+    return jsonify({"success": True})
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from flask import Blueprint, Response, current_app, jsonify, request, g
+from flask_jwt_extended import create_refresh_token, decode_token, jwt_required
+
+import events
+
+events_bp = Blueprint('events', __name__)
+
+# Claim marking a stream ticket. Tickets are refresh-type tokens, which jwt_required() and the
+# global auth hook reject, so one that leaks from an access log cannot call the rest of the API
+TICKET_SCOPE = 'events_stream'
+
+
+@events_bp.route('/ticket', methods=['POST'])
+@jwt_required()
+def stream_ticket():
+    """Short-lived ticket for EventSource clients, which cannot set an Authorization header.
+
+    The ticket goes in the stream URL (?ticket=) and therefore in access logs, so it
+    expires after EVENTS_TICKET_TTL seconds and only opens /api/events/stream.
+    """
+    if not g.user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    ttl = current_app.config['EVENTS_TICKET_TTL']
+    ticket = create_refresh_token(identity=str(g.user.id), expires_delta=timedelta(seconds=ttl),
+                                  additional_claims={'scope': TICKET_SCOPE})
+    return jsonify({"success": True, "ticket": ticket, "expiresIn": ttl})
+
+
+def _stream_user_id():
+    """User id from the Authorization header or a stream ticket from /api/events/ticket."""
+    if getattr(g, 'user', None):
+        return g.user.id
+    ticket = request.args.get('ticket')
+    if not ticket:
+        return None
+    try:
+        claims = decode_token(ticket)
+    except Exception as e:
+        print(f"[events] rejected stream ticket: {e}")
+        return None
+    if claims.get('type') != 'refresh' or claims.get('scope') != TICKET_SCOPE:
+        return None
+    return claims['sub']
+
+
+@events_bp.route('/stream', methods=['GET'])
+def event_stream():
+    user_id = _stream_user_id()
+    if not user_id:
+        return jsonify({"success": False, "message": "Authentication required"}), 401
+
+    sub = events.subscribe(user_id)
+    if sub is None:
+        return jsonify({"success": False, "message": "Too many open streams, retry later"}), 503
+
+    # The generator needs no request context, so none is held open for the life of the stream
+    response = Response(events.stream(sub), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # nginx: flush each event instead of buffering
+    })
+    # The generator's own cleanup only runs if it was started; a client that disconnects
+    # before the first frame would otherwise keep its subscription forever
+    response.call_on_close(lambda: events.bus.unsubscribe(sub))
+    return response
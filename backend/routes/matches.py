@@ -4,9 +4,16 @@ from datetime import datetime, timezone
 from flask import Blueprint, jsonify, request, g
 from flask_jwt_extended import jwt_required
 from mongoengine import Q
-from mongoengine.errors import NotUniqueError
+from mongoengine.errors import NotUniqueError, ValidationError
 
-from models import User, Match, MatchAction
+from models import User, Match, MatchAction, SwipeBatch
+from metrics import SWIPES_TOTAL
+import discovery
+import events
+import rollups
+import swipes
+from discovery import serialize_user
+from suggestions import explain
 
 matches_bp = Blueprint('matches', __name__)
 
@@ -14,25 +21,6 @@ matches_bp = Blueprint('matches', __name__)
 # Helpers
 # -----------------------------
 
-def _serialize_user(u: User):
-    """Map a User document to the shape expected by the React UI."""
-    rating_avg = 0.0
-    if getattr(u, "rating", None) and getattr(u.rating, "average", None) is not None:
-        rating_avg = float(u.rating.average)
-
-    return {
-        "_id": str(u.id),
-        "name": getattr(u, "name", "Unknown"),
-        "avatar": getattr(u, "avatar", "👤"),
-        "userType": getattr(u, "user_type", "contributor"),
-        "categories": list(getattr(u, "categories", [])),
-        "bio": getattr(u, "bio", ""),
-        "experience": getattr(u, "experience", ""),
-        "location": getattr(u, "location", ""),
-        "completedProjects": getattr(u, "completed_projects", 0),
-        "rating": {"average": rating_avg},
-    }
-
 def _pair_key(a: User, b: User):
     """Return a deterministic (user_low, user_high) tuple for the pair."""
     return (a, b) if str(a.id) < str(b.id) else (b, a)
@@ -40,16 +28,18 @@ def _pair_key(a: User, b: User):
 def _get_or_create_match(me: User, other: User, project=None) -> Match:
     """Atomically fetch or create the Match for (me, other)."""
     u1, u2 = _pair_key(me, other)
-    try:
-        comp = me.calculate_compatibility(other)
-    except Exception:
-        comp = 87.0
 
     # 1) fast path: already exists
     m = Match.objects(Q(user1=u1) & Q(user2=u2)).first()
     if m:
         return m
 
+    # Only a new match stores the explanation, so only this path computes it
+    try:
+        comp, details, metadata = explain(me, other)
+    except Exception:
+        comp, details, metadata = 87.0, None, None
+
     # 2) atomic upsert; if a unique race happens, refetch
     try:
         m = Match.objects(user1=u1, user2=u2).modify(
@@ -59,7 +49,8 @@ def _get_or_create_match(me: User, other: User, project=None) -> Match:
             set_on_insert__match_type=('user-to-user' if project is None else 'user-to-project'),
             set_on_insert__initiated_by=me,
             set_on_insert__compatibility_score=comp,
-            set_on_insert__match_details=None,
+            set_on_insert__match_details=details,
+            set_on_insert__metadata=metadata,
             set_on_insert__user1_action=MatchAction(action='pending', timestamp=datetime.now(timezone.utc)),
             set_on_insert__user2_action=MatchAction(action='pending', timestamp=datetime.now(timezone.utc)),
         )
@@ -115,23 +106,20 @@ def discover():
     except ValueError:
         limit = 10
 
+    # Signed-in users get their cached, scored candidate list
+    if getattr(g, "user", None):
+        return jsonify({"success": True, "matches": discovery.discover_for(g.user, limit)}), 200
+
     try:
-        q = User.objects
-        if getattr(g, "user", None):
-            q = q.filter(id__ne=g.user.id)
-        users = q.limit(limit)
+        users = User.objects.limit(limit)
     except Exception:
         users = []
 
     matches = []
     for u in users:
-        try:
-            score = g.user.calculate_compatibility(u) if getattr(g, "user", None) else 87
-        except Exception:
-            score = 87
         matches.append({
-            "user": _serialize_user(u),
-            "compatibilityScore": score,
+            "user": serialize_user(u),
+            "compatibilityScore": 87,
             "matchDetails": {"reasonForMatch": "Shared categories & interests"}
         })
 
@@ -168,7 +156,9 @@ def like():
     m = _get_or_create_match(g.user, other, project=None)
     if not m:
         return jsonify({"success": False, "message": "Could not create or fetch match"}), 500
+    before = m.to_mongo().to_dict()
     _set_action_for_user(m, g.user, "like")
+    discovery.remove_candidate(g.user, other.id)
 
     # reflect like at User level (idempotent mirror)
     try:
@@ -190,6 +180,11 @@ def like():
     my_act = _my_action(m, g.user)
     their_act = _their_action(m, g.user)
     is_mutual = (my_act == "like" and their_act == "like" and m.status == "mutual")
+    SWIPES_TOTAL.inc(outcome="like")
+    if is_mutual:
+        SWIPES_TOTAL.inc(outcome="mutual")
+    rollups.record_match_change(before, m.to_mongo().to_dict(), {g.user.id: g.user, other.id: other})
+    events.notify_like(g.user, other, is_mutual)
 
     return jsonify({
         "success": True,
@@ -224,7 +219,11 @@ def pass_user():
     m = _get_or_create_match(g.user, other, project=None)
     if not m:
         return jsonify({"success": False, "message": "Could not create or fetch match"}), 500
+    before = m.to_mongo().to_dict()
     _set_action_for_user(m, g.user, "pass")
+    discovery.remove_candidate(g.user, other.id)
+    SWIPES_TOTAL.inc(outcome="pass")
+    rollups.record_match_change(before, m.to_mongo().to_dict(), {g.user.id: g.user, other.id: other})
 
     # optional tidy-up: remove any prior like mirror
     try:
@@ -241,6 +240,50 @@ def pass_user():
     return jsonify({"success": True, "passed": str(other.id)}), 200
 
 
+@matches_bp.route("/actions", methods=["POST", "OPTIONS"])
+@jwt_required()
+def batch_actions():
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    if not getattr(g, "user", None):
+        return jsonify({"success": False, "message": "Authentication required"}), 401
+
+    data = request.get_json(silent=True) or {}
+    items = data.get("actions")
+    if not isinstance(items, list) or not items:
+        return jsonify({"success": False, "message": "actions must be a non-empty list"}), 400
+    if len(items) > swipes.MAX_BATCH_SIZE:
+        return jsonify({"success": False, "message": f"At most {swipes.MAX_BATCH_SIZE} actions per batch"}), 400
+
+    # A retried batch with the same key gets the stored response without touching matches again
+    key = request.headers.get("Idempotency-Key") or data.get("idempotencyKey")
+    if key is not None and (not isinstance(key, str) or len(key) > SwipeBatch.key.max_length):
+        return jsonify({"success": False,
+                        "message": f"Idempotency key must be a string of at most {SwipeBatch.key.max_length} characters"}), 400
+    if key:
+        done = SwipeBatch.objects(user=g.user.id, key=key).only("response").first()
+        if done:
+            return jsonify(done.response), 200
+
+    try:
+        results = swipes.apply_batch(g.user, items)
+    except Exception as e:
+        print(f"Server error in batch_actions: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
+    response = {"success": True, "results": results}
+    if key:
+        try:
+            SwipeBatch(user=g.user.id, key=key, response=response).save(force_insert=True)
+        except NotUniqueError:
+            pass  # a concurrent retry stored it first; both applied the same idempotent swipes
+        except ValidationError as e:
+            # The swipes are applied; losing the replay copy only costs a retry re-applying them
+            print(f"[matches.actions] could not store batch response: {e}")
+    return jsonify(response), 200
+
+
 # -----------------------------
 # Reads: liked-me / my-matches
 # -----------------------------
@@ -298,7 +341,7 @@ def liked_me():
         other = r["other"]
         m = r["match"]
         items.append({
-            "user": _serialize_user(other),
+            "user": serialize_user(other),
             "likedAt": r["theirLikedAt"].isoformat() if r["theirLikedAt"] else None,
             "isMutual": (m.status == "mutual"),
             "matchId": f"{str(m.user1.id)}_{str(m.user2.id)}"
@@ -357,7 +400,7 @@ def my_matches():
 
         results.append({
             "_id": f"{str(m.user1.id)}_{str(m.user2.id)}",
-            "otherUser": _serialize_user(other),
+            "otherUser": serialize_user(other),
             "compatibilityScore": comp,
             "conversation": {
                 "started": bool(getattr(m, "conversation", None) and m.conversation.started)
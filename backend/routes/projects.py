@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify, g
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import User, Project
+from models import User, Project, ProjectApplication, ProjectCollaborator
 from middleware import require_user_type, require_complete_profile
+from write_behind import view_counter
+import conditional
+import rollups
+from skills import normalize_skill_ids, projects_needing_skills, canonical_name, ranked_pagination
+from recommendations import recommend_projects, rank_candidates, invalidate_candidates
 from mongoengine.queryset.visitor import Q
 from bson import ObjectId # Import ObjectId for serialization
 
@@ -119,6 +124,50 @@ def get_projects():
         print(f"Server error in get_projects: {e}")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
 
+# Dashboard cards: maintained counters plus milestone progress, no embedded arrays
+SUMMARY_PROJECTION = {
+    'title': 1,
+    'category': 1,
+    'status': 1,
+    'views': 1,
+    'teamSize': '$team_size',
+    'applicantCount': {'$ifNull': ['$applicant_count', 0]},
+    'pendingApplicationCount': {'$ifNull': ['$pending_application_count', 0]},
+    'collaboratorCount': {'$ifNull': ['$collaborator_count', 0]},
+    'completionPercentage': {'$let': {
+        'vars': {'milestones': {'$ifNull': ['$milestones', []]}},
+        'in': {'$cond': [
+            {'$gt': [{'$size': '$$milestones'}, 0]},
+            {'$round': [{'$multiply': [
+                {'$divide': [
+                    {'$size': {'$filter': {'input': '$$milestones', 'as': 'm', 'cond': {'$eq': ['$$m.completed', True]}}}},
+                    {'$size': '$$milestones'},
+                ]},
+                100,
+            ]}, 0]},
+            0,
+        ]},
+    }},
+    'createdAt': '$created_at',
+}
+
+def _my_project_summaries(query, skip, limit):
+    """One aggregation over the (creator, status, created_at) index: a page of cards and the total."""
+    result = next(Project.objects.aggregate([
+        {'$match': query},
+        {'$facet': {
+            'cards': [
+                {'$sort': {'created_at': -1, '_id': -1}},
+                {'$skip': skip},
+                {'$limit': limit},
+                {'$project': SUMMARY_PROJECTION},
+            ],
+            'total': [{'$count': 'n'}],
+        }},
+    ]), {'cards': [], 'total': []})
+    total = result['total'][0]['n'] if result['total'] else 0
+    return result['cards'], total
+
 @projects_bp.route('/my-projects', methods=['GET'])
 @jwt_required() # Enforce authentication
 def get_my_projects():
@@ -131,6 +180,19 @@ def get_my_projects():
         query = {'creator': g.user.id}
         if status:
             query['status'] = status
+
+        if query_params.get('view') == 'summary':
+            cards, total = _my_project_summaries(query, (page - 1) * limit, limit)
+            return jsonify({
+                "success": True,
+                "projects": convert_objectids_to_strings(cards),
+                "pagination": {
+                    "page": page,
+                    "limit": limit,
+                    "total": total,
+                    "pages": (total + limit - 1) // limit
+                }
+            })
             
         projects = Project.objects(__raw__=query).order_by('-created_at').skip((page - 1) * limit).limit(limit)
         total = Project.objects(__raw__=query).count()
@@ -151,17 +213,132 @@ def get_my_projects():
         print(f"Server error in get_my_projects: {e}")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
 
+@projects_bp.route('/recommended', methods=['GET'])
+@jwt_required() # Enforce authentication
+@require_complete_profile
+def get_recommended_projects():
+    try:
+        limit = min(50, max(1, int(request.args.get('limit', 20))))
+    except ValueError:
+        limit = 20
+    try:
+        projects, next_cursor = recommend_projects(g.user, limit=limit, cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        print(f"Server error in get_recommended_projects: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
+    projects_list = []
+    for project, score in projects:
+        project_dict = project.to_mongo().to_dict()
+        project_dict['matchScore'] = score
+        project_dict['canApply'] = True # Ineligible projects are filtered out by the query
+        projects_list.append(convert_objectids_to_strings(project_dict))
+
+    return jsonify({
+        "success": True,
+        "projects": projects_list,
+        "nextCursor": next_cursor
+    })
+
+@projects_bp.route('/for-my-skills', methods=['GET'])
+@jwt_required() # Enforce authentication
+def get_projects_for_my_skills():
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        limit = min(50, max(1, int(request.args.get('limit', 20))))
+
+        # Skill-index lookup: only projects sharing at least one canonical skill id are touched
+        skill_ids = normalize_skill_ids(s.name for s in g.user.skills)
+        rows, total = projects_needing_skills(skill_ids, exclude_creator=g.user.id,
+                                              skip=(page - 1) * limit, limit=limit)
+        projects_by_id = {p.id: p for p in Project.objects(id__in=[r['_id'] for r in rows])}
+
+        projects_list = []
+        for row in rows:
+            project = projects_by_id.get(row['_id'])
+            if not project:
+                continue
+            project_dict = project.to_mongo().to_dict()
+            project_dict['matchingSkills'] = [canonical_name(skill_id) for skill_id in row['matchingSkills']]
+            project_dict['matchScore'] = project.calculate_match_score(g.user)
+            projects_list.append(convert_objectids_to_strings(project_dict))
+
+        return jsonify({
+            "success": True,
+            "projects": projects_list,
+            "pagination": ranked_pagination(page, limit, total)
+        })
+    except Exception as e:
+        print(f"Server error in get_projects_for_my_skills: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
+@projects_bp.route('/<project_id>/candidates', methods=['GET'])
+@jwt_required() # Enforce authentication
+def get_project_candidates(project_id):
+    if not g.user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    try:
+        project = Project.objects.get(id=project_id)
+    except Project.DoesNotExist:
+        return jsonify({"success": False, "message": "Project not found"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Invalid project id: {str(e)}"}), 400
+
+    if project.creator_id != g.user.id:
+        return jsonify({"success": False, "message": "Only the project creator can view candidates"}), 403
+
+    try:
+        limit = min(50, max(1, int(request.args.get('limit', 20))))
+    except ValueError:
+        limit = 20
+    try:
+        ranked, next_cursor = rank_candidates(project, limit=limit, cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        print(f"Server error in get_project_candidates: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
+    return jsonify({
+        "success": True,
+        "projectId": str(project.id),
+        "candidates": [{
+            "user": user_card,
+            "matchScore": score,
+            "matchType": "project-to-user"
+        } for user_card, score in ranked],
+        "nextCursor": next_cursor
+    })
+
 @projects_bp.route('/<project_id>', methods=['GET'])
 @jwt_required(optional=True) # Public view, but more info if authenticated
 def get_project(project_id):
+    if not ObjectId.is_valid(project_id):
+        return jsonify({"success": False, "message": "Project not found"}), 404
     try:
+        row = Project._get_collection().find_one({'_id': ObjectId(project_id)}, {'updated_at': 1, 'creator': 1})
+        if row is None:
+            return jsonify({"success": False, "message": "Project not found"}), 404
+
+        # Count views only from other users; buffered and flushed as batched $inc writes
+        if g.user and row.get('creator') != g.user.id:
+            view_counter.record(row['_id'], g.user.id)
+
+        # matchScore and canApply depend on the viewer, so they are part of the validator;
+        # applies and decisions bump the project's updated_at
+        viewer = g.user
+        updated_at = conditional.latest(row.get('updated_at'), *([viewer.updated_at] if viewer else []))
+        etag, modified = conditional.validators(
+            'project', updated_at, project_id,
+            viewer.id if viewer else 'anonymous', viewer.profile_version if viewer else '')
+        if conditional.is_fresh(etag, modified):
+            return conditional.not_modified(etag, modified, conditional.PRIVATE_REVALIDATE, vary='Authorization')
+
         project = Project.objects.get(id=project_id)
         
-        # Increment views only if accessed by a different user
-        if g.user and str(project.creator.id) != str(g.user.id):
-            project.views += 1
-            project.save()
-        
         match_score = None
         can_apply = False
         if g.user: # Calculate only if user is authenticated
@@ -169,19 +346,148 @@ def get_project(project_id):
             can_apply = project.can_user_apply(g.user.id)
         
         project_dict = project.to_mongo().to_dict()
+        project_dict.pop('applications', None)
+        project_dict['collaborators'] = list(ProjectCollaborator.objects(
+            project=project.id, status__in=['accepted', 'active']).exclude('project').as_pymongo())
         project_dict = convert_objectids_to_strings(project_dict) # Apply conversion
         
+        project_dict['views'] = project_dict.get('views', 0) + view_counter.pending(project.id)
         project_dict['matchScore'] = match_score
         project_dict['canApply'] = can_apply
         
-        return jsonify({
+        return conditional.with_validators(jsonify({
             "success": True,
             "project": project_dict
-        })
+        }), etag, modified, conditional.PRIVATE_REVALIDATE, vary='Authorization')
     except Project.DoesNotExist:
         return jsonify({"success": False, "message": "Project not found"}), 404
     except Exception as e:
         print(f"Server error in get_project: {e}")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
 
-# Additional routes for PUT, DELETE, apply, update application status, etc.
+@projects_bp.route('/<project_id>/apply', methods=['POST'])
+@jwt_required()
+@require_complete_profile
+def apply_to_project(project_id):
+    try:
+        project = Project.objects.get(id=project_id)
+    except Project.DoesNotExist:
+        return jsonify({"success": False, "message": "Project not found"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Invalid project id: {str(e)}"}), 400
+
+    data = request.get_json(silent=True) or {}
+    try:
+        application = ProjectApplication.apply(project, g.user, message=data.get('message'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        print(f"Server error in apply_to_project: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    rollups.record_application(project, g.user)
+    invalidate_candidates(project.id)
+
+    return jsonify({
+        "success": True,
+        "message": "Application submitted",
+        "application": convert_objectids_to_strings(application.to_mongo().to_dict())
+    }), 201
+
+@projects_bp.route('/<project_id>/applications', methods=['GET'])
+@jwt_required()
+def get_project_applications(project_id):
+    project = Project.objects(id=project_id).only('creator').first() if ObjectId.is_valid(project_id) else None
+    if not project:
+        return jsonify({"success": False, "message": "Project not found"}), 404
+    if project.creator_id != g.user.id:
+        return jsonify({"success": False, "message": "Only the project creator can view applications"}), 403
+
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+    try:
+        limit = min(50, max(1, int(request.args.get('limit', 20))))
+    except ValueError:
+        limit = 20
+    skip = (page - 1) * limit
+
+    query = {'project': project.id}
+    if request.args.get('status'):
+        query['status'] = request.args['status']
+
+    try:
+        # Served by the (project, status, applied_at) index
+        applications = ProjectApplication.objects(**query).order_by('-applied_at').skip(skip).limit(limit)
+        total = ProjectApplication.objects(**query).count()
+        applicants = {u.id: u for u in User.objects(
+            id__in=[a._data['user'].id for a in applications]).only('name', 'avatar', 'skills', 'user_type')}
+
+        items = []
+        for application in applications:
+            item = convert_objectids_to_strings(application.to_mongo().to_dict())
+            applicant = applicants.get(application._data['user'].id)
+            if applicant:
+                item['user'] = {
+                    "_id": str(applicant.id),
+                    "name": applicant.name,
+                    "avatar": applicant.avatar,
+                    "userType": applicant.user_type,
+                    "skills": [s.name for s in (applicant.skills or [])]
+                }
+            items.append(item)
+
+        return jsonify({
+            "success": True,
+            "applications": items,
+            "pagination": {
+                "page": page,
+                "limit": limit,
+                "total": total,
+                "pages": (total + limit - 1) // limit
+            }
+        })
+    except Exception as e:
+        print(f"Server error in get_project_applications: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
+@projects_bp.route('/<project_id>/applications/<application_id>', methods=['PUT'])
+@jwt_required()
+def update_application_status(project_id, application_id):
+    project = Project.objects(id=project_id).only('creator', 'category').first() if ObjectId.is_valid(project_id) else None
+    if not project:
+        return jsonify({"success": False, "message": "Project not found"}), 404
+    if project.creator_id != g.user.id:
+        return jsonify({"success": False, "message": "Only the project creator can review applications"}), 403
+
+    application = ProjectApplication.objects(id=application_id, project=project.id).first() \
+        if ObjectId.is_valid(application_id) else None
+    if not application:
+        return jsonify({"success": False, "message": "Application not found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    status = data.get('status')
+    try:
+        if status == 'accepted':
+            application.accept(role=data.get('role'))
+            applicant = User.objects(id=application._data['user'].id).only('user_type').first()
+            if applicant:
+                rollups.record_application(project, applicant, metric='accepted')
+            invalidate_candidates(project.id)
+        elif status == 'rejected':
+            application.reject()
+        else:
+            return jsonify({"success": False, "message": "status must be 'accepted' or 'rejected'"}), 400
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 409
+    except Exception as e:
+        print(f"Server error in update_application_status: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
+    return jsonify({
+        "success": True,
+        "message": f"Application {status}",
+        "application": convert_objectids_to_strings(application.to_mongo().to_dict())
+    })
+
+# Additional routes for PUT, DELETE, etc.
@@ -1,9 +1,15 @@
+from datetime import datetime, timezone
+
 from flask import Blueprint, request, jsonify, g
 from flask_jwt_extended import jwt_required # Keep jwt_required for route decorators
 from models import User
 from middleware import require_complete_profile
+from skills import normalize_skill, normalize_skill_ids, users_with_skills, canonical_name, ranked_pagination
 from mongoengine.queryset.visitor import Q
 from bson import ObjectId # Import ObjectId for serialization
+import conditional
+import profiles
+import feature_store
 
 users_bp = Blueprint('users', __name__)
 
@@ -26,15 +32,20 @@ def get_profile():
         if not user: # Safety check
             return jsonify({"success": False, "message": "User not found."}), 404
 
+        # g.user is already loaded, so a matching validator costs no query at all
+        etag, modified = conditional.validators('own-profile', user.updated_at, user.id, user.profile_version)
+        if conditional.is_fresh(etag, modified):
+            return conditional.not_modified(etag, modified, conditional.PRIVATE_REVALIDATE)
+
         user_dict = user.to_mongo().to_dict()
         user_dict.pop('password', None)
         user_dict = convert_objectids_to_strings(user_dict) # Apply conversion
         
-        return jsonify({
+        return conditional.with_validators(jsonify({
             "success": True,
             "user": user_dict,
             "profileCompletion": user.profile_completion
-        })
+        }), etag, modified, conditional.PRIVATE_REVALIDATE)
     except Exception as e:
         print(f"Server error in get_profile: {e}") # Added error logging
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
@@ -54,10 +65,19 @@ def update_profile():
     ]
     
     update_data = {key: data[key] for key in data if key in allowed_updates}
+
+    # update() skips document validation, so stamp canonical skill ids here
+    if isinstance(update_data.get('skills'), list):
+        update_data['skills'] = [
+            {**skill, 'skill_id': normalize_skill(skill.get('name'))}
+            for skill in update_data['skills'] if isinstance(skill, dict)
+        ]
     
     try:
-        user.update(**update_data)
+        user.update(inc__profile_version=1, set__updated_at=datetime.now(timezone.utc), **update_data)
         user.reload()
+        profiles.invalidate(user.id)
+        feature_store.record_profile(user)
         
         user_dict = user.to_mongo().to_dict()
         user_dict.pop('password', None)
@@ -73,26 +93,91 @@ def update_profile():
         print(f"Server error in update_profile: {e}") # Added error logging
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
 
+# Kept above /<user_id> so "batch" is never taken for an id
+@users_bp.route('/batch', methods=['GET'])
+@jwt_required(optional=True)
+def get_users_batch():
+    try:
+        ids = profiles.parse_ids(request.args.get('ids'), limit=300)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    try:
+        found = profiles.public_profiles(ids)
+    except Exception as e:
+        print(f"Server error in get_users_batch: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
+    return jsonify({
+        "success": True,
+        "users": [convert_objectids_to_strings(found[i]) for i in ids if i in found], # Request order
+        "missing": [str(i) for i in ids if i not in found]
+    })
+
 @users_bp.route('/<user_id>', methods=['GET'])
 @jwt_required(optional=True) # User ID route might be publicly viewable, but shows more if authenticated
 def get_user_profile(user_id):
+    if not ObjectId.is_valid(user_id):
+        return jsonify({"success": False, "message": "User not found"}), 404
     try:
+        # Projected lookup first; the full document is only read when the client's copy is stale
+        row = User._get_collection().find_one({'_id': ObjectId(user_id)}, {'updated_at': 1, 'profile_version': 1})
+        if row is None:
+            return jsonify({"success": False, "message": "User not found"}), 404
+        etag, modified = conditional.validators('public-profile', row.get('updated_at'), user_id,
+                                                row.get('profile_version', 0))
+        if conditional.is_fresh(etag, modified):
+            return conditional.not_modified(etag, modified, conditional.PUBLIC_REVALIDATE)
+
         user = User.objects.get(id=user_id)
         
         user_data = user.to_public_dict()
         # Ensure ObjectIds are converted to strings in the public dict
         user_data = convert_objectids_to_strings(user_data) 
 
-        return jsonify({
+        return conditional.with_validators(jsonify({
             "success": True,
             "user": user_data
-        })
+        }), etag, modified, conditional.PUBLIC_REVALIDATE)
     except User.DoesNotExist:
         return jsonify({"success": False, "message": "User not found"}), 404
     except Exception as e:
         print(f"Server error in get_user_profile: {e}") # Added error logging
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
 
+@users_bp.route('/by-skills', methods=['GET'])
+@jwt_required() # This route requires authentication
+def get_users_by_skills():
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        limit = min(50, max(1, int(request.args.get('limit', 20))))
+        skill_ids = normalize_skill_ids(request.args.get('skills', '').split(','))
+        if not skill_ids:
+            return jsonify({"success": False, "message": "skills is required"}), 400
+
+        rows, total = users_with_skills(skill_ids, exclude_user=g.user.id, skip=(page - 1) * limit, limit=limit)
+        users_by_id = {u.id: u for u in User.objects(id__in=[r['_id'] for r in rows])}
+
+        users_list = []
+        for row in rows:
+            user = users_by_id.get(row['_id'])
+            if not user:
+                continue
+            user_data = convert_objectids_to_strings(user.to_public_dict())
+            user_data['_id'] = str(user.id)
+            user_data['matchingSkills'] = [canonical_name(skill_id) for skill_id in row['matchingSkills']]
+            users_list.append(user_data)
+
+        return jsonify({
+            "success": True,
+            "skills": [canonical_name(skill_id) for skill_id in skill_ids],
+            "users": users_list,
+            "pagination": ranked_pagination(page, limit, total)
+        })
+    except Exception as e:
+        print(f"Server error in get_users_by_skills: {e}")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
 @users_bp.route('/search', methods=['GET'])
 @jwt_required() # This route requires authentication
 @require_complete_profile
@@ -2,7 +2,8 @@ import os
 from datetime import datetime, timedelta, timezone # Import timezone
 import bcrypt
 from mongoengine import connect, disconnect
-from models import User, Project, Match, RequiredSkill, ProjectTimeline, EstimatedDuration, ProjectBudget, Attachment, Collaborator, Application, Milestone, Rating, Skill, PortfolioItem, UserPreferences, VerificationStatus, MatchAction, MatchDetails, Conversation, Feedback, Metadata, Factor, TeamSize # Import all models
+from models import User, Project, Match, RequiredSkill, ProjectTimeline, EstimatedDuration, ProjectBudget, Attachment, ProjectApplication, ProjectCollaborator, Milestone, Rating, Skill, PortfolioItem, UserPreferences, VerificationStatus, MatchAction, MatchDetails, Conversation, Feedback, Metadata, Factor, TeamSize, MatchSuggestion, PipelineCheckpoint # Import all models
+from suggestions import match_reason, match_details as build_match_details
 
 # Load environment variables (ensure .env is in backend_py directory)
 from dotenv import load_dotenv
@@ -242,15 +243,7 @@ sample_projects_data = [
 
 def generate_match_reason(user1, user2, score):
     common_categories = [cat for cat in user1.categories if cat in user2.categories]
-    
-    if score >= 80:
-        return f"Excellent match! You both work in {', '.join(common_categories)} and have complementary skills."
-    elif score >= 60:
-        return f"Great potential! You share interests in {', '.join(common_categories)}."
-    elif score >= 40:
-        return "Interesting match with some overlapping areas."
-    else:
-        return "Different backgrounds might bring fresh perspectives."
+    return match_reason(common_categories, score)
 
 def seed_database():
     try:
@@ -262,6 +255,10 @@ def seed_database():
         User.drop_collection()
         Project.drop_collection()
         Match.drop_collection()
+        ProjectApplication.drop_collection()
+        ProjectCollaborator.drop_collection()
+        MatchSuggestion.drop_collection()
+        PipelineCheckpoint.drop_collection()
         print('🗑️ Cleared existing data')
 
         # Create users
@@ -309,11 +306,7 @@ def seed_database():
                     user2_action.action = 'like'
                     user2_action.timestamp = datetime.now(timezone.utc)
                 
-                match_details = MatchDetails(
-                    common_categories=[cat for cat in contributor.categories if cat in creator.categories],
-                    reason_for_match=generate_match_reason(contributor, creator, compatibility_score),
-                    confidence_level='high' if compatibility_score >= 70 else ('medium' if compatibility_score >= 40 else 'low')
-                )
+                match_details = build_match_details(contributor, creator, compatibility_score)
 
                 match_instance = Match(
                     user1=contributor.id,
@@ -336,12 +329,14 @@ def seed_database():
             num_applications = int(int.from_bytes(os.urandom(1), 'big') / 256 * 3) + 1 # 1-3 random applications
             for i in range(min(num_applications, len(applicable_users))):
                 applicant = applicable_users[i]
-                project.applications.append(Application(
-                    user=applicant.id,
-                    message=f"I'm very interested in joining this project. My experience in {', '.join(applicant.categories)} would be valuable.",
-                    status='pending'
-                ))
-            project.save()
+                try:
+                    ProjectApplication.apply(
+                        project,
+                        applicant,
+                        message=f"I'm very interested in joining this project. My experience in {', '.join(applicant.categories)} would be valuable."
+                    )
+                except ValueError as e:
+                    print(f'⚠️ Skipped application from {applicant.name}: {e}')
 
         print('✅ Database seeded successfully!')
         print(f'👥 Created {len(created_users)} users')
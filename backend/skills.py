@@ -0,0 +1,162 @@
+import re
+
+# Canonical skill id -> (display name, aliases). Lookup keys ignore case,
+# whitespace, dots, dashes and underscores, so "Node JS" / "node.js" /
+# "NodeJS" already collapse; aliases cover genuinely different spellings.
+SKILL_TAXONOMY = {
+    'react': ('React', ['react.js', 'reactjs']),
+    'react-native': ('React Native', ['rn']),
+    'nodejs': ('Node.js', ['node']),
+    'javascript': ('JavaScript', ['js', 'ecmascript', 'es6']),
+    'typescript': ('TypeScript', ['ts']),
+    'python': ('Python', ['python3', 'py']),
+    'django': ('Django', []),
+    'flask': ('Flask', []),
+    'vue': ('Vue.js', ['vuejs', 'vue']),
+    'angular': ('Angular', ['angularjs']),
+    'nextjs': ('Next.js', ['next']),
+    'golang': ('Go', ['go']),
+    'java': ('Java', []),
+    'kotlin': ('Kotlin', []),
+    'swift': ('Swift', []),
+    'csharp': ('C#', ['c#', 'c sharp']),
+    'cpp': ('C++', ['c++', 'cplusplus']),
+    'ruby-on-rails': ('Ruby on Rails', ['rails', 'ror']),
+    'sql': ('SQL', []),
+    'postgresql': ('PostgreSQL', ['postgres', 'psql']),
+    'mongodb': ('MongoDB', ['mongo']),
+    'aws': ('AWS', ['amazon web services']),
+    'gcp': ('Google Cloud', ['google cloud platform']),
+    'azure': ('Azure', ['microsoft azure']),
+    'docker': ('Docker', []),
+    'kubernetes': ('Kubernetes', ['k8s']),
+    'devops': ('DevOps', []),
+    'machine-learning': ('Machine Learning', ['ml']),
+    'ai': ('Artificial Intelligence', ['artificial intelligence', 'ai/ml']),
+    'data-science': ('Data Science', []),
+    'ui-ux-design': ('UI/UX Design', ['ui/ux', 'ux/ui', 'ux design', 'ui design', 'uiux']),
+    'product-design': ('Product Design', []),
+    'graphic-design': ('Graphic Design', []),
+    'figma': ('Figma', []),
+    'product-management': ('Product Management', ['product manager', 'pm']),
+    'project-management': ('Project Management', []),
+    'marketing': ('Marketing', []),
+    'digital-marketing': ('Digital Marketing', ['online marketing']),
+    'seo': ('SEO', ['search engine optimization']),
+    'social-media': ('Social Media', ['social media marketing', 'smm']),
+    'copywriting': ('Copywriting', ['copy writing']),
+    'content-writing': ('Content Writing', ['content creation']),
+    'video-editing': ('Video Editing', []),
+    'photography': ('Photography', []),
+    'game-design': ('Game Design', []),
+    'educational-technology': ('Educational Technology', ['edtech']),
+    'blockchain': ('Blockchain', ['web3']),
+    'cybersecurity': ('Cybersecurity', ['security', 'infosec']),
+}
+
+_STRIP_RE = re.compile(r'[\s._\-]+')
+
+
+def _lookup_key(name):
+    return _STRIP_RE.sub('', (name or '').strip().lower())
+
+
+_ALIASES = {}
+for _skill_id, (_display, _aliases) in SKILL_TAXONOMY.items():
+    for _alias in [_skill_id, _display] + _aliases:
+        _ALIASES.setdefault(_lookup_key(_alias), _skill_id)
+
+
+def normalize_skill(name):
+    """Canonical skill id for a free-text skill name ("React.js" -> "react"); None for blanks.
+
+    Unknown skills get their lookup key as id, so spelling variants that only
+    differ in case or punctuation still match each other.
+    """
+    key = _lookup_key(name)
+    if not key:
+        return None
+    return _ALIASES.get(key, key)
+
+
+def canonical_name(skill_id, fallback=None):
+    entry = SKILL_TAXONOMY.get(skill_id)
+    return entry[0] if entry else (fallback or skill_id)
+
+
+def normalize_skill_ids(names):
+    """Distinct canonical ids for a list of skill names, in first-seen order."""
+    seen = []
+    for name in names:
+        skill_id = normalize_skill(name)
+        if skill_id and skill_id not in seen:
+            seen.append(skill_id)
+    return seen
+
+
+# ----------------- Inverted-index lookups -----------------
+# The multikey indexes on skills.skill_id / required_skills.skill_id are the
+# inverted index; the overlap with the caller's skills is computed by the
+# server for the matching documents only.
+
+# How deep overlap rankings go; the sort keeps at most this many documents
+# and totals are capped at it, so a popular skill costs the same as a rare one.
+# The by-skills endpoints report it as pagination.maxResults and set
+# pagination.capped when a query had more matches than this.
+MAX_RANKED = 1000
+
+
+def projects_needing_skills(skill_ids, exclude_creator=None, skip=0, limit=20):
+    """Open public projects requiring any of ``skill_ids``, most overlapping first.
+
+    Returns (rows, total) where each row carries ``_id`` and ``matchingSkills``.
+    Only the ``MAX_RANKED`` best matches are ranked and ``total`` never exceeds it.
+    """
+    from models import Project
+    match = {'required_skills.skill_id': {'$in': list(skill_ids)}, 'status': 'open', 'is_public': True}
+    if exclude_creator is not None:
+        match['creator'] = {'$ne': exclude_creator}
+    return _ranked_by_overlap(Project, match, 'required_skills.skill_id', skill_ids, skip, limit)
+
+
+def users_with_skills(skill_ids, exclude_user=None, skip=0, limit=20):
+    """Active users having any of ``skill_ids``, most overlapping first.
+
+    Same (rows, total) shape and ``MAX_RANKED`` cap as ``projects_needing_skills``.
+    """
+    from models import User
+    match = {'skills.skill_id': {'$in': list(skill_ids)}, 'is_active': True}
+    if exclude_user is not None:
+        match['_id'] = {'$ne': exclude_user}
+    return _ranked_by_overlap(User, match, 'skills.skill_id', skill_ids, skip, limit)
+
+
+def _ranked_by_overlap(document, match, field, skill_ids, skip, limit):
+    skill_ids = list(skill_ids)
+    if not skill_ids:
+        return [], 0
+    total = document.objects(__raw__=match).limit(MAX_RANKED).count(with_limit_and_skip=True)
+    if skip >= total:
+        return [], total
+    rows = list(document.objects.aggregate([
+        {'$match': match},
+        {'$project': {'matchingSkills': {'$setIntersection': [f'${field}', {'$literal': skill_ids}]}}},
+        {'$addFields': {'overlap': {'$size': '$matchingSkills'}}},
+        # $sort straight into $limit is a top-k sort holding only skip + limit documents
+        {'$sort': {'overlap': -1, '_id': -1}},
+        {'$limit': min(skip + limit, MAX_RANKED)},
+        {'$skip': skip},
+    ], allowDiskUse=True))
+    return rows, total
+
+
+def ranked_pagination(page, limit, total):
+    """Pagination block for an overlap ranking, stating the ``MAX_RANKED`` cap."""
+    return {
+        "page": page,
+        "limit": limit,
+        "total": total,
+        "pages": (total + limit - 1) // limit,
+        "maxResults": MAX_RANKED,
+        "capped": total >= MAX_RANKED
+    }
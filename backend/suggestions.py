@@ -0,0 +1,185 @@
+import itertools
+import os
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from feature_store import FeatureStore, RECORD, pack
+from models import COMPATIBILITY_WEIGHTS, weighted_compatibility, User, Match, MatchDetails, Metadata, Factor, MatchSuggestion, PipelineCheckpoint
+from parallel_scoring import ParallelScorer
+from skills import normalize_skill
+
+JOB_NAME = 'nightly_matches'
+
+# Everything feature_store.pack and User.compatibility_factors read, plus what MatchDetails reports
+FIELDS = {'is_active': 1, 'user_type': 1, 'categories': 1, 'experience': 1, 'rating': 1, 'last_active': 1,
+          'skills.skill_id': 1, 'skills.name': 1}
+
+
+# ----------------- Match details -----------------
+
+def confidence_level(score):
+    return 'high' if score >= 70 else ('medium' if score >= 40 else 'low')
+
+
+def match_reason(common_categories, score):
+    if score >= 80:
+        return f"Excellent match! You both work in {', '.join(common_categories)} and have complementary skills."
+    elif score >= 60:
+        return f"Great potential! You share interests in {', '.join(common_categories)}."
+    elif score >= 40:
+        return "Interesting match with some overlapping areas."
+    else:
+        return "Different backgrounds might bring fresh perspectives."
+
+
+def _skill_names(user):
+    """{canonical skill id: display name} for a user's skills."""
+    names = {}
+    for skill in user.skills or []:
+        key = skill.skill_id or normalize_skill(skill.name)
+        if key:
+            names.setdefault(key, skill.name)
+    return names
+
+
+def match_details(user, other, score):
+    """MatchDetails for ``user`` looking at ``other``, as seed_database.py fills them."""
+    common_categories = [c for c in user.categories if c in other.categories]
+    mine, theirs = _skill_names(user), _skill_names(other)
+    return MatchDetails(
+        common_categories=common_categories,
+        common_skills=[name for key, name in mine.items() if key in theirs],
+        reason_for_match=match_reason(common_categories, score),
+        confidence_level=confidence_level(score),
+    )
+
+
+def match_metadata(factors):
+    """Metadata recording each compatibility factor's 0..1 score and its weight."""
+    return Metadata(factors=[Factor(name=name, weight=COMPATIBILITY_WEIGHTS[name], score=round(value, 4))
+                             for name, value in factors.items()])
+
+
+def explain(user, other):
+    """(score, MatchDetails, Metadata) for ``user`` looking at ``other``."""
+    factors = user.compatibility_factors(other)
+    score = weighted_compatibility(factors)
+    return score, match_details(user, other, score), match_metadata(factors)
+
+
+# ----------------- Nightly pipeline -----------------
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _start(restart):
+    """Resume the unfinished run, or start a new one; returns the checkpoint."""
+    checkpoint = PipelineCheckpoint.objects(id=JOB_NAME).first()
+    if checkpoint and not checkpoint.completed_at and not restart:
+        return checkpoint
+    now = datetime.now(timezone.utc)
+    checkpoint = PipelineCheckpoint(id=JOB_NAME, run_id=str(ObjectId()), last_id=None,
+                                    processed=0, started_at=now, updated_at=now, completed_at=None)
+    checkpoint.save()
+    return checkpoint
+
+
+def _existing_pairs(user_ids):
+    """{user id: ids of everyone they already share a Match with}."""
+    seen = {uid: {uid} for uid in user_ids}
+    rows = Match._get_collection().find(
+        {'$or': [{'user1': {'$in': user_ids}}, {'user2': {'$in': user_ids}}]}, {'user1': 1, 'user2': 1})
+    for row in rows:
+        for side, other in (('user1', 'user2'), ('user2', 'user1')):
+            if row[side] in seen:
+                seen[row[side]].add(row[other])
+    return seen
+
+
+def _process_chunk(scorer, docs, top_k, run_id, now):
+    """Score, explain and upsert suggestions for one chunk of raw user docs; returns suggestions written."""
+    users = [User._from_son(doc) for doc in docs]
+    ids = [u.id for u in users]
+    excluded = _existing_pairs(ids)
+    ranked = scorer.top_k('compatibility', [RECORD.unpack(pack(doc)) for doc in docs], top_k,
+                          [excluded[uid] for uid in ids])
+
+    winner_ids = list({oid for picks in ranked for _, oid in picks})
+    others = {doc['_id']: User._from_son(doc)
+              for doc in User._get_collection().find({'_id': {'$in': winner_ids}}, FIELDS)}
+
+    ops = []
+    for user, picks in zip(users, ranked):
+        scored = []
+        for _, other_id in picks:
+            other = others.get(other_id)
+            if other is None:
+                continue
+            scored.append((other.id, *explain(user, other)))
+        # The store's ranking can drift from the live documents; order by the recomputed score
+        scored.sort(key=lambda item: item[1], reverse=True)
+        for rank, (other_id, score, details, metadata) in enumerate(scored, 1):
+            ops.append(UpdateOne({'user': user.id, 'suggested_user': other_id}, {'$set': {
+                'score': round(score, 2),
+                'rank': rank,
+                'match_details': details.to_mongo(),
+                'metadata': metadata.to_mongo(),
+                'run_id': run_id,
+                'generated_at': now,
+            }}, upsert=True))
+
+    suggestions = MatchSuggestion._get_collection()
+    if ops:
+        suggestions.bulk_write(ops, ordered=False)
+    # Anything these users were suggested by an earlier run and not again by this one
+    suggestions.delete_many({'user': {'$in': ids}, 'run_id': {'$ne': run_id}})
+    return len(ops)
+
+
+def run(store_path, chunk_size=500, top_k=20, workers=None, restart=False, log=print):
+    """Generate suggestions for every active user, resuming an interrupted run unless ``restart``.
+
+    Users are read through one server-side cursor in _id order, ``chunk_size``
+    at a time, and scored against a feature-store snapshot taken when the run
+    starts, so memory is one chunk plus the store whatever the user count.
+    After each chunk's bulk upsert the checkpoint records the chunk's last _id;
+    a crashed run picks up after it with the same run id and snapshot.
+    """
+    checkpoint = _start(restart)
+    users = User._get_collection()
+    if checkpoint.last_id is None or not os.path.exists(store_path):
+        count = FeatureStore.build(store_path, users.find({}, FIELDS).batch_size(5000))
+        log(f'🧮 Snapshot of {count} users written to {store_path}')
+    if checkpoint.last_id is not None:
+        log(f'↪️  Resuming run {checkpoint.run_id} after {checkpoint.last_id} ({checkpoint.processed} users done)')
+
+    query = {'is_active': True}
+    if checkpoint.last_id is not None:
+        query['_id'] = {'$gt': checkpoint.last_id}
+    cursor = users.find(query, FIELDS, no_cursor_timeout=True).sort('_id', 1).batch_size(chunk_size)
+    written = 0
+    try:
+        with ParallelScorer(store_path, workers=workers) as scorer:
+            for docs in _chunks(cursor, chunk_size):
+                now = datetime.now(timezone.utc)
+                written += _process_chunk(scorer, docs, top_k, checkpoint.run_id, now)
+                PipelineCheckpoint._get_collection().update_one({'_id': JOB_NAME}, {
+                    '$set': {'last_id': docs[-1]['_id'], 'updated_at': now},
+                    '$inc': {'processed': len(docs)},
+                })
+                checkpoint.processed += len(docs)
+                log(f'✅ {checkpoint.processed} users processed, {written} suggestions written this session')
+    finally:
+        cursor.close()
+
+    PipelineCheckpoint._get_collection().update_one(
+        {'_id': JOB_NAME}, {'$set': {'completed_at': datetime.now(timezone.utc)}})
+    return checkpoint.processed, written
@@ -0,0 +1,68 @@
+"""Run from backend/: python -m unittest discover tests"""
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from bson import ObjectId
+
+import events
+import swipes
+
+
+class FirstBatchLikeTest(unittest.TestCase):
+    """With EVENTS_SOURCE=change_stream a batch like on a new pair arrives as an insert."""
+
+    def setUp(self):
+        self.liker, self.target = sorted([ObjectId(), ObjectId()], key=str)
+        now = datetime.now(timezone.utc)
+        self.doc = {
+            '_id': ObjectId(), 'user1': self.liker, 'user2': self.target, 'status': 'pending',
+            'user1_action': {'action': 'like', 'timestamp': now},
+            'user2_action': {'action': 'pending', 'timestamp': now},
+        }
+
+    def dispatch(self, change):
+        with mock.patch.object(events, '_deliver_like') as like, \
+             mock.patch.object(events, '_deliver_mutual') as mutual, \
+             mock.patch.object(events.bus, 'publish') as publish:
+            events.MatchWatcher.dispatch(change)
+        return like, mutual, publish
+
+    def test_watcher_listens_for_inserts(self):
+        operations = events.MatchWatcher._PIPELINE[0]['$match']['operationType']['$in']
+        self.assertIn('insert', operations)
+
+    def test_insert_with_like_delivers_like_received(self):
+        like, mutual, publish = self.dispatch({'operationType': 'insert', 'fullDocument': self.doc})
+        like.assert_called_once_with(self.liker, self.target)
+        mutual.assert_not_called()
+        publish.assert_not_called()
+
+    def test_insert_without_like_delivers_nothing(self):
+        self.doc['user1_action']['action'] = 'pass'
+        like, mutual, _ = self.dispatch({'operationType': 'insert', 'fullDocument': self.doc})
+        like.assert_not_called()
+        mutual.assert_not_called()
+
+    def test_update_only_delivers_touched_side(self):
+        self.doc['user2_action'] = {'action': 'like', 'timestamp': datetime.now(timezone.utc)}
+        self.doc['status'] = 'mutual'
+        like, mutual, _ = self.dispatch({
+            'operationType': 'update', 'fullDocument': self.doc,
+            'updateDescription': {'updatedFields': {'user2_action': self.doc['user2_action'], 'status': 'mutual'}},
+        })
+        like.assert_called_once_with(self.target, self.liker)
+        mutual.assert_called_once_with(self.liker, self.target)
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_non_object_items_fail_individually(self):
+        target = str(ObjectId())
+        actions, errors = swipes._normalize(['abc', [1], 5, {'targetUserId': target, 'action': 'like'}])
+        self.assertEqual(actions, {ObjectId(target): 'like'})
+        self.assertEqual(sorted(errors), [0, 1, 2])
+        self.assertEqual(errors[0], 'Each swipe must be an object')
+
+
+if __name__ == '__main__':
+    unittest.main()
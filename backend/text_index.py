@@ -0,0 +1,208 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from array import array
+from collections import Counter
+
+# Hashed unigram + bigram features; 2**20 buckets keeps collisions rare for profile-sized text
+FEATURE_BITS = 20
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have i in is it its of on or our so that the their '
+    'this to was we were will with you your'.split())
+
+_ARRAYS = (('terms', 'I'), ('idf', 'f'), ('ptr', 'Q'), ('docs', 'I'), ('weights', 'f'))
+
+
+def tokenize(text):
+    words = [w for w in _TOKEN_RE.findall((text or '').lower()) if w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _feature(token):
+    return zlib.crc32(token.encode('utf-8')) & ((1 << FEATURE_BITS) - 1)
+
+
+def _term_counts(text):
+    return Counter(_feature(t) for t in tokenize(text))
+
+
+def user_text(user):
+    # Skill names count twice: they are short but the strongest signal
+    skills = [s.name for s in (user.skills or []) if s.name]
+    return ' '.join([user.bio or '', user.experience or ''] + skills * 2)
+
+
+def project_text(project):
+    skills = [s.skill for s in (project.required_skills or []) if s.skill]
+    return ' '.join([project.title or '', project.description or ''] + skills * 2)
+
+
+class TextIndex:
+    """TF-IDF vectors stored as a term-major (CSC) sparse matrix.
+
+    ``terms``/``idf`` list the feature ids present in the corpus, ``ptr`` gives
+    each term's slice of ``docs``/``weights`` (its posting list). Document
+    vectors are L2-normalized, so a query touches only the postings of its
+    own terms and the accumulated dot products are cosine similarities.
+    """
+
+    def __init__(self, ids, terms, idf, ptr, docs, weights):
+        self.ids = ids
+        self.terms, self.idf, self.ptr, self.docs, self.weights = terms, idf, ptr, docs, weights
+        self._term_pos = {t: i for i, t in enumerate(terms)}
+
+    @classmethod
+    def build(cls, documents):
+        """Build from an iterable of (doc id, text) pairs."""
+        ids, doc_counts, df = [], [], Counter()
+        for doc_id, text in documents:
+            counts = _term_counts(text)
+            ids.append(str(doc_id))
+            doc_counts.append(counts)
+            df.update(counts.keys())
+
+        n = len(ids)
+        terms = sorted(df)
+        idf = {t: math.log((1 + n) / (1 + df[t])) + 1 for t in terms}
+
+        postings = {t: [] for t in terms}
+        for doc_idx, counts in enumerate(doc_counts):
+            vec = {t: (1 + math.log(c)) * idf[t] for t, c in counts.items()}
+            norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+            for t, w in vec.items():
+                postings[t].append((doc_idx, w / norm))
+
+        ptr, docs, weights = array('Q', [0]), array('I'), array('f')
+        for t in terms:
+            for doc_idx, w in postings[t]:
+                docs.append(doc_idx)
+                weights.append(w)
+            ptr.append(len(docs))
+        return cls(ids, array('I', terms), array('f', (idf[t] for t in terms)), ptr, docs, weights)
+
+    def query_vector(self, text):
+        vec = {}
+        for t, c in _term_counts(text).items():
+            pos = self._term_pos.get(t)
+            if pos is not None:
+                vec[pos] = (1 + math.log(c)) * self.idf[pos]
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {pos: w / norm for pos, w in vec.items()}
+
+    def top_k(self, text, k, exclude=()):
+        """Return up to ``k`` (doc id, cosine similarity) pairs, best first."""
+        scores = {}
+        for pos, qw in self.query_vector(text).items():
+            for i in range(self.ptr[pos], self.ptr[pos + 1]):
+                doc = self.docs[i]
+                scores[doc] = scores.get(doc, 0.0) + qw * self.weights[i]
+        exclude = {str(e) for e in exclude}
+        best = heapq.nlargest(k + len(exclude), scores.items(), key=lambda kv: kv[1])
+        return [(self.ids[doc], score) for doc, score in best if self.ids[doc] not in exclude][:k]
+
+    def save(self, directory, name):
+        """Write the arrays under fresh file names, then swap the manifest that points at them.
+
+        A worker that read the previous manifest keeps reading the previous
+        arrays, which stay until the next save; older generations are removed.
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, f'{name}.json')
+        try:
+            with open(manifest_path) as f:
+                previous = set(json.load(f).get('files', {}).values())
+        except (OSError, ValueError):
+            previous = set()
+
+        generation = f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}'
+        files = {attr: f'{name}.{generation}.{attr}.bin' for attr, _ in _ARRAYS}
+        for attr, _ in _ARRAYS:
+            tmp = os.path.join(directory, f'.{files[attr]}.tmp')
+            with open(tmp, 'wb') as f:
+                getattr(self, attr).tofile(f)
+            os.replace(tmp, os.path.join(directory, files[attr]))
+        # Manifest last: loaders key off its mtime
+        tmp = os.path.join(directory, f'.{name}.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'ids': self.ids, 'featureBits': FEATURE_BITS, 'files': files,
+                       'sizes': {attr: len(getattr(self, attr)) for attr, _ in _ARRAYS}}, f)
+        os.replace(tmp, manifest_path)
+
+        keep = previous | set(files.values())
+        for filename in os.listdir(directory):
+            if filename.startswith(f'{name}.') and filename.endswith('.bin') and filename not in keep:
+                os.remove(os.path.join(directory, filename))
+
+    @classmethod
+    def load(cls, directory, name):
+        with open(os.path.join(directory, f'{name}.json')) as f:
+            manifest = json.load(f)
+        if manifest.get('featureBits') != FEATURE_BITS:
+            raise ValueError(f"{name} index was built with different feature hashing; rebuild it")
+        files = manifest.get('files') or {attr: f'{name}.{attr}.bin' for attr, _ in _ARRAYS}
+        arrays = {}
+        for attr, typecode in _ARRAYS:
+            arr = array(typecode)
+            with open(os.path.join(directory, files[attr]), 'rb') as f:
+                arr.fromfile(f, manifest['sizes'][attr])
+            arrays[attr] = arr
+        return cls(manifest['ids'], **arrays)
+
+
+# ----------------- Process-wide access -----------------
+
+_settings = {'directory': None}
+_loaded = {}  # name -> (manifest mtime, TextIndex)
+_load_lock = threading.Lock()
+
+
+def init_app(app):
+    _settings['directory'] = app.config.get('TEXT_INDEX_DIR')
+
+
+def get_index(name):
+    """Return the named index ('users' or 'projects'), reloading after a rebuild; None if unavailable."""
+    directory = _settings['directory']
+    if not directory:
+        return None
+    try:
+        mtime = os.path.getmtime(os.path.join(directory, f'{name}.json'))
+    except OSError:
+        return None
+    cached = _loaded.get(name)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with _load_lock:
+        cached = _loaded.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            index = TextIndex.load(directory, name)
+        except (OSError, ValueError, EOFError) as e:
+            print(f"[text_index] could not load {name}: {e}")
+            return cached[1] if cached else None
+        _loaded[name] = (mtime, index)
+        return index
+
+
+def similar_users(user, k, exclude=()):
+    """Ids of up to ``k`` users whose bio/experience/skills read most like ``user``'s."""
+    index = get_index('users')
+    if index is None:
+        return None
+    return [doc_id for doc_id, _ in index.top_k(user_text(user), k, exclude=set(exclude) | {user.id})]
+
+
+def similar_projects(user, k, exclude=()):
+    """Ids of up to ``k`` projects whose text best matches ``user``'s profile."""
+    index = get_index('projects')
+    if index is None:
+        return None
+    return [doc_id for doc_id, _ in index.top_k(user_text(user), k, exclude=exclude)]
@@ -0,0 +1,227 @@
+import atexit
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError, ServerSelectionTimeoutError
+
+import feature_store
+from models import EngagementRollup, Project, User
+
+
+class WriteBehindBuffer(ABC):
+    """Collects writes in process memory and flushes them in bulk on a background thread.
+
+    The flusher starts lazily on first use in each process, so buffers created
+    at import time in a pre-fork master are safe: every worker gets its own
+    thread and its own pending state. Pending writes are flushed at exit.
+
+    A failed flush requeues only entries known not to be written: the failed
+    operations of a partial bulk write, or the whole batch when the server was
+    never reached. After an error that leaves it unknown, entries are requeued
+    only when applying them twice is harmless (``idempotent``).
+    """
+
+    idempotent = False
+
+    def __init__(self, name, interval=5.0):
+        self.name = name
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pid = None
+        self._stop = threading.Event()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked from a process that already buffered: the parent owns those writes
+                self._pending = {}
+                self._stop = threading.Event()
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name=f'pairup-{self.name}-flusher', daemon=True).start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            collection, ops = self._operations(batch)
+            collection.bulk_write([op for op, _ in ops], ordered=False)
+        except BulkWriteError as e:
+            failed = {key for error in e.details.get('writeErrors', []) for key in ops[error['index']][1]}
+            print(f"[{self.name}] flush partly failed, requeueing {len(failed)} of {len(batch)} entries: {e}")
+            self._retry({key: batch[key] for key in failed})
+            self._written({key: value for key, value in batch.items() if key not in failed})
+            return len(batch) - len(failed)
+        except PyMongoError as e:
+            if isinstance(e, ServerSelectionTimeoutError) or self.idempotent:
+                print(f"[{self.name}] flush failed, requeueing {len(batch)} entries: {e}")
+                self._retry(batch)
+            else:
+                # Some operations may have been applied; requeueing could count them twice
+                print(f"[{self.name}] flush failed, dropping {len(batch)} entries that may be partly applied: {e}")
+            return 0
+        except Exception as e:
+            # Raised before anything reached the server (building or encoding the operations)
+            print(f"[{self.name}] flush failed, requeueing {len(batch)} entries: {e}")
+            self._retry(batch)
+            return 0
+        self._written(batch)
+        return len(batch)
+
+    def _retry(self, batch):
+        if batch:
+            with self._lock:
+                self._requeue(batch)
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    @abstractmethod
+    def _operations(self, batch):
+        """(collection, [(write operation, batch keys it applies), ...]) for ``batch``."""
+
+    def _written(self, batch):
+        """Called with the entries that were applied."""
+
+    @abstractmethod
+    def _requeue(self, batch):
+        """Merge ``batch`` back into the pending writes."""
+
+
+class ViewCounter(WriteBehindBuffer):
+    """Buffers project view increments and applies them as batched ``$inc`` writes.
+
+    With a dedup window, repeat views of the same project by the same user
+    inside the window are ignored (per worker process).
+    """
+
+    def __init__(self, interval=5.0, dedup_window=0):
+        super().__init__('views', interval)
+        self.dedup_window = dedup_window
+        self._seen = {}
+
+    def record(self, project_id, viewer_id=None):
+        """Count a view; returns False when it was dropped as a repeat."""
+        self._ensure_started()
+        project_id = str(project_id)
+        now = time.monotonic()
+        with self._lock:
+            if self.dedup_window and viewer_id is not None:
+                key = (project_id, str(viewer_id))
+                if self._seen.get(key, 0) > now:
+                    return False
+                self._seen[key] = now + self.dedup_window
+            self._pending[project_id] = self._pending.get(project_id, 0) + 1
+        return True
+
+    def pending(self, project_id):
+        return self._pending.get(str(project_id), 0)
+
+    def flush(self):
+        if self._seen:
+            now = time.monotonic()
+            with self._lock:
+                self._seen = {k: exp for k, exp in self._seen.items() if exp > now}
+        return super().flush()
+
+    def _operations(self, batch):
+        return Project._get_collection(), [
+            (UpdateOne({'_id': ObjectId(pid)}, {'$inc': {'views': n}}), [pid]) for pid, n in batch.items()]
+
+    def _requeue(self, batch):
+        for pid, n in batch.items():
+            self._pending[pid] = self._pending.get(pid, 0) + n
+
+
+class ActivityTracker(WriteBehindBuffer):
+    """Coalesces ``last_active`` bumps into one ``$max`` update per user per interval."""
+
+    # $max keeps the write idempotent and never moves last_active backwards
+    idempotent = True
+
+    def __init__(self, interval=5.0):
+        super().__init__('activity', interval)
+
+    def record(self, user_id, when=None):
+        self._ensure_started()
+        when = when or datetime.now(timezone.utc)
+        user_id = str(user_id)
+        with self._lock:
+            latest = self._pending.get(user_id)
+            if latest is None or when > latest:
+                self._pending[user_id] = when
+
+    def _operations(self, batch):
+        return User._get_collection(), [
+            (UpdateOne({'_id': ObjectId(uid)}, {'$max': {'last_active': when}}), [uid]) for uid, when in batch.items()]
+
+    def _written(self, batch):
+        if batch:
+            feature_store.record_activity(batch)
+
+    def _requeue(self, batch):
+        for uid, when in batch.items():
+            latest = self._pending.get(uid)
+            if latest is None or when > latest:
+                self._pending[uid] = when
+
+
+class RollupCounter(WriteBehindBuffer):
+    """Sums engagement rollup increments and applies them as batched ``$inc`` upserts.
+
+    Keys are (day, dimension, value, metric); see rollups.py.
+    """
+
+    def __init__(self, interval=5.0):
+        super().__init__('rollups', interval)
+
+    def record(self, keys, metric, n=1):
+        self._ensure_started()
+        with self._lock:
+            for day, dimension, value in keys:
+                key = (day, dimension, value, metric)
+                self._pending[key] = self._pending.get(key, 0) + n
+
+    def _operations(self, batch):
+        by_doc = {}
+        for key, n in batch.items():
+            day, dimension, value, metric = key
+            inc, keys = by_doc.setdefault((day, dimension, value), ({}, []))
+            inc[f'counts.{metric}'] = n
+            keys.append(key)
+        return EngagementRollup._get_collection(), [
+            (UpdateOne({'day': day, 'dimension': dimension, 'value': value}, {'$inc': inc}, upsert=True), keys)
+            for (day, dimension, value), (inc, keys) in by_doc.items()]
+
+    def _requeue(self, batch):
+        for key, n in batch.items():
+            self._pending[key] = self._pending.get(key, 0) + n
+
+
+view_counter = ViewCounter()
+activity_tracker = ActivityTracker()
+rollup_counter = RollupCounter()
+
+
+def init_app(app):
+    view_counter.interval = app.config['VIEW_FLUSH_INTERVAL']
+    view_counter.dedup_window = app.config['VIEW_DEDUP_WINDOW']
+    activity_tracker.interval = app.config['ACTIVITY_FLUSH_INTERVAL']
+    rollup_counter.interval = app.config['ROLLUP_FLUSH_INTERVAL']
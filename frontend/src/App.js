@@ -105,6 +105,9 @@ const api = {
       request(`/matches/my-matches?status=${status}`),
     getLikedMe: () => request('/matches/liked-me'),
   },
+
+  // Profile, match counts and the first discovery page in one round trip
+  bootstrap: () => request('/bootstrap/'),
 };
 
 const PairUpApp = () => {
@@ -174,7 +177,7 @@ const PairUpApp = () => {
 
   const checkAuthStatus = async () => {
     try {
-      const response = await api.auth.getProfile(); // { user, profileCompletion }
+      const response = await api.bootstrap(); // { user, profileCompletion, counts, discovery }
       const completion = Number(response?.profileCompletion ?? 0);
       const u = response.user || {};
       setUser(u);
@@ -183,7 +186,8 @@ const PairUpApp = () => {
 
       if (completion >= 80) {
         setCurrentStep('matching');
-        loadMatches();
+        setMatches(response.discovery || []);
+        setCurrentCardIndex(0);
       } else {
         setCurrentStep('categories');
         setUserProfile(prev => ({